@@ -283,6 +283,7 @@ def solve(
 
         # If we've reached the goal:
         if current == goal_board:
+            write_inversions(possible_number_of_inversions)
             # return the list of states it took to get there.
             state_path = [current]
             step = current
@@ -308,22 +309,15 @@ def solve(
             if neighbor in evaluated_states:
                 continue
 
-            print("current neighbor is:\n", neighbor.to_string())
             i += 1
             if i > 999999:
+                write_inversions(possible_number_of_inversions)
                 return possible_number_of_inversions
-            print(neighbor.to_string())
-            neighbor_as_list = list(neighbor.to_string().split())
-            print(neighbor_as_list)
-            inv = count_inversions(puzzle_board=neighbor_as_list)
-            print("current number of inversions is:", inv)
-            possible_number_of_inversions.append(inv)
-
-            import csv
-            with open('inversion_999999_states_luddy.csv', 'w') as output:
-                writer = csv.writer(output, lineterminator='\n')
-                for val in possible_number_of_inversions:
-                    writer.writerow([val])
+            # the tiles in cell order, straight from the block positions
+            neighbor_as_list = sorted(neighbor.board_blocks, key=neighbor.board_blocks.get)
+            possible_number_of_inversions.append(
+                count_inversions(puzzle_board=neighbor_as_list)
+            )
 
             # Add it to our open heap
             heapq.heappush(fringe, neighbor)
@@ -341,9 +335,23 @@ def solve(
                                          neighbor
                                      ] + neighbor.calculate_manhattan_distance(goal_board)
 
+    write_inversions(possible_number_of_inversions)
     return False
 
 
+def write_inversions(possible_number_of_inversions: list):
+    """
+    Writes the inversion counts gathered by solve(), once, when it stops. For
+    statistics over more boards than A* visits, see state_space.py.
+    :param possible_number_of_inversions: the inversion count of every neighbor
+    """
+    import csv
+
+    with open("inversion_999999_states_luddy.csv", "w") as output:
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerows([val] for val in possible_number_of_inversions)
+
+
 def calculate_move(old_coordinate: tuple, new_coordinate: tuple, luddy: bool = False) -> str:
     """
     Function to determine the move based on older and latest coordinates of zero
@@ -0,0 +1,175 @@
+#!/usr/local/bin/python3
+#
+# board_cache.py : Persistent store of solved boards and their optimal paths
+#
+# Usage: ./board_cache.py cache-file
+#
+# Every board on an optimal path is itself solved optimally by the rest of that
+# path, so solve_luddy.py stores all of them, each with its distance to the goal
+# and the moves that get it there. Rows are keyed by the puzzle (variant, board
+# shape and packed goal) and the packed board, and live in an SQLite file, so
+# they outlast the process and can be shared by several runs. Reading a row
+# marks it as recently used. Once there are more than max_boards rows, the ones
+# used longest ago are removed. Run on its own, this prints what the cache holds.
+#
+import sqlite3
+import sys
+
+# rows kept before the least recently used are evicted
+MAX_BOARDS = 1000000
+
+# boards looked up per query by distances(), well under SQLite's variable limit
+LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solved (
+    variant TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    goal BLOB NOT NULL,
+    board BLOB NOT NULL,
+    distance INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (variant, rows, cols, goal, board)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS solved_used ON solved (used);
+"""
+
+
+def _blob(state: int) -> bytes:
+    """a packed board as bytes, since SQLite integers stop at 63 bits"""
+    return state.to_bytes((state.bit_length() + 7) // 8 or 1, "big")
+
+
+class BoardCache(object):
+    """
+    Solved boards in an SQLite file. A puzzle is a (variant, rows, cols, packed
+    goal) tuple, and boards are packed the way solve_luddy.pack() packs them.
+    """
+
+    def __init__(self, path: str, max_boards: int = MAX_BOARDS):
+        self.max_boards = max_boards
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+        self.clock = self.db.execute("SELECT COALESCE(MAX(used), 0) FROM solved").fetchone()[0]
+
+    def _tick(self) -> int:
+        self.clock += 1
+        return self.clock
+
+    def lookup(self, puzzle: tuple, state: int):
+        """
+        The optimal moves from a board to the puzzle's goal
+        :return: the path as a string of move letters, or None if not cached
+        """
+        variant, rows, cols, goal = puzzle
+        key = (variant, rows, cols, _blob(goal), _blob(state))
+        row = self.db.execute(
+            "SELECT path FROM solved"
+            " WHERE variant = ? AND rows = ? AND cols = ? AND goal = ? AND board = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute(
+                "UPDATE solved SET used = ?"
+                " WHERE variant = ? AND rows = ? AND cols = ? AND goal = ? AND board = ?",
+                (self._tick(),) + key,
+            )
+        return row[0]
+
+    def holds(self, puzzle: tuple) -> bool:
+        """whether any board of a puzzle is cached"""
+        variant, rows, cols, goal = puzzle
+        row = self.db.execute(
+            "SELECT 1 FROM solved"
+            " WHERE variant = ? AND rows = ? AND cols = ? AND goal = ? LIMIT 1",
+            (variant, rows, cols, _blob(goal)),
+        ).fetchone()
+        return row is not None
+
+    def distances(self, puzzle: tuple, states: list) -> dict:
+        """
+        The distance to the goal of those of some boards that are cached, read by
+        primary key, LOOKUP_BATCH boards a query
+        :param puzzle: (variant, rows, cols, packed goal)
+        :param states: packed boards
+        :return: dict of packed board -> distance, for the cached ones only
+        """
+        variant, rows, cols, goal = puzzle
+        found = dict()
+        for start in range(0, len(states), LOOKUP_BATCH):
+            batch = [_blob(state) for state in states[start : start + LOOKUP_BATCH]]
+            found.update(
+                (int.from_bytes(board, "big"), distance)
+                for board, distance in self.db.execute(
+                    "SELECT board, distance FROM solved"
+                    " WHERE variant = ? AND rows = ? AND cols = ? AND goal = ?"
+                    " AND board IN (%s)" % ", ".join("?" * len(batch)),
+                    (variant, rows, cols, _blob(goal), *batch),
+                )
+            )
+        return found
+
+    def store(self, puzzle: tuple, states: list, path: str) -> None:
+        """
+        Stores an optimal path and every board along it, then evicts the least
+        recently used rows if there are more than max_boards
+        :param puzzle: (variant, rows, cols, packed goal)
+        :param states: the packed boards along the path, start first, goal last
+        :param path: the moves from states[0] to the goal
+        """
+        variant, rows, cols, goal = puzzle
+        used = self._tick()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO solved VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        variant,
+                        rows,
+                        cols,
+                        _blob(goal),
+                        _blob(state),
+                        len(path) - step,
+                        path[step:],
+                        used,
+                    )
+                    for step, state in enumerate(states)
+                ),
+            )
+            excess = self.db.execute("SELECT COUNT(*) FROM solved").fetchone()[0]
+            excess -= self.max_boards
+            if excess > 0:
+                self.db.execute(
+                    "DELETE FROM solved WHERE (variant, rows, cols, goal, board) IN"
+                    " (SELECT variant, rows, cols, goal, board FROM solved"
+                    " ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM solved").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def main() -> None:
+    if len(sys.argv) != 2:
+        raise Exception("Error: expected a cache file")
+
+    cache = BoardCache(sys.argv[1])
+    print("%d boards" % len(cache))
+    for variant, rows, cols, boards, deepest in cache.db.execute(
+        "SELECT variant, rows, cols, COUNT(*), MAX(distance) FROM solved"
+        " GROUP BY variant, rows, cols"
+    ):
+        print("%s %dx%d: %d boards, up to %d moves out" % (variant, rows, cols, boards, deepest))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/local/bin/python3
+#
+# external_bfs.py : Disk-backed breadth-first search over a puzzle's state space
+#
+# Usage: ./external_bfs.py board variant work-dir [buffer-boards] [max-depth|-]
+#
+# state_space.py keeps three layers in dicts, so it runs out of memory long
+# before it runs out of boards. This keeps every layer on disk instead, as a
+# sorted file of fixed-width records: the packed board, big-endian so that byte
+# order is numeric order, followed by one byte for its blank cell. A layer is
+# expanded by streaming its memory-mapped file. Children are gathered in a
+# buffer of at most buffer-boards, which is sorted and written out as a run
+# whenever it fills. The runs are then merged, and duplicates are dropped
+# against each other and against the layer being expanded and the one before
+# it. Since every move can be undone, those are the only layers a new board can
+# already be in. progress.json records every finished layer and run. A search
+# that is interrupted picks up from the last run it wrote when it is started
+# again with the same work-dir.
+#
+import heapq
+import json
+import mmap
+import os
+import sys
+import time
+
+import solve_luddy
+
+# children held in memory before they are sorted and written out as a run
+BUFFER_BOARDS = 1 << 20
+
+# records are read and written this many at a time
+IO_RECORDS = 1 << 14
+
+PROGRESS = "progress.json"
+
+
+def record_width() -> int:
+    """bytes per record: the packed board, then a byte for the blank cell"""
+    return (solve_luddy.ROWS * solve_luddy.COLS * solve_luddy._TILE_BITS + 7) // 8 + 1
+
+
+def layer_path(work_dir: str, depth: int) -> str:
+    return os.path.join(work_dir, "layer-%04d.bin" % depth)
+
+
+def run_path(work_dir: str, index: int) -> str:
+    return os.path.join(work_dir, "run-%04d.bin" % index)
+
+
+def write_records(path: str, codes) -> int:
+    """
+    Writes records, each a packed board shifted left 8 bits with its blank cell
+    in the low byte, to path + '.tmp' and then renames it over path, so path is
+    either complete or missing
+    :return: the number of records written
+    """
+    width = record_width()
+    count = 0
+    chunk = bytearray()
+    with open(path + ".tmp", "wb") as output:
+        for code in codes:
+            chunk += code.to_bytes(width, "big")
+            count += 1
+            if count % IO_RECORDS == 0:
+                output.write(chunk)
+                chunk = bytearray()
+        output.write(chunk)
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def read_records(path: str, start: int = 0):
+    """yields the records in a file, from record start on, as ints"""
+    width = record_width()
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as records:
+            step = width * IO_RECORDS
+            for offset in range(start * width, len(records), step):
+                chunk = records[offset : offset + step]
+                for at in range(0, len(chunk), width):
+                    yield int.from_bytes(chunk[at : at + width], "big")
+
+
+def _unique(codes):
+    """drops repeats from a sorted stream"""
+    last = None
+    for code in codes:
+        if code != last:
+            yield code
+            last = code
+
+
+def _without(codes, seen):
+    """drops every code in sorted stream seen from sorted stream codes"""
+    other = next(seen, None)
+    for code in codes:
+        while other is not None and other < code:
+            other = next(seen, None)
+        if code != other:
+            yield code
+
+
+def _load_progress(work_dir: str, key: dict) -> dict:
+    """
+    The progress of the search in work_dir, or a new one. Anything on disk that
+    progress.json doesn't list as finished was cut off mid-write and is removed.
+    """
+    path = os.path.join(work_dir, PROGRESS)
+    if os.path.exists(path):
+        with open(path) as file:
+            progress = json.load(file)
+        if progress["key"] != key:
+            raise Exception(
+                "Error: %s holds a search from another board or variant" % work_dir
+            )
+    else:
+        progress = {
+            "key": key,
+            "layers": [],
+            "parents_done": 0,
+            "runs": 0,
+            "finished": False,
+        }
+    keep = {os.path.basename(layer_path(work_dir, d)) for d in range(len(progress["layers"]))}
+    keep |= {os.path.basename(run_path(work_dir, r)) for r in range(progress["runs"])}
+    for name in os.listdir(work_dir):
+        ours = name.endswith(".tmp") or (
+            name.endswith(".bin") and name.startswith(("layer-", "run-"))
+        )
+        if ours and name not in keep:
+            os.remove(os.path.join(work_dir, name))
+    return progress
+
+
+def _save_progress(work_dir: str, progress: dict) -> None:
+    path = os.path.join(work_dir, PROGRESS)
+    with open(path + ".tmp", "w") as output:
+        json.dump(progress, output)
+    os.replace(path + ".tmp", path)
+
+
+def external_bfs(
+    board: solve_luddy.PuzzleBoard,
+    work_dir: str,
+    variant=None,
+    buffer_boards=BUFFER_BOARDS,
+    max_depth=None,
+    on_layer=None,
+) -> list:
+    """
+    Breadth-first search from board with every layer kept on disk in work_dir,
+    resuming the search already there if there is one
+    :param board: the board to start from, at depth 0
+    :param work_dir: directory for the layer files, created if needed
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :param buffer_boards: children held in memory before a run is written
+    :param max_depth: stop once this layer is on disk, None for no limit
+    :param on_layer: called with (depth, boards) as each layer is finished
+    :return: the number of boards on each layer, by depth
+    """
+    variant = variant or solve_luddy.HEURISTIC
+    os.makedirs(work_dir, exist_ok=True)
+    moves = solve_luddy.move_table(variant)
+    bits = solve_luddy._TILE_BITS
+    mask = solve_luddy._TILE_MASK
+    start = solve_luddy.pack(board)
+    blank = board.board_blocks[0][0] * solve_luddy.COLS + board.board_blocks[0][1]
+    key = {
+        "start": start,
+        "variant": variant,
+        "shape": [solve_luddy.ROWS, solve_luddy.COLS],
+    }
+    progress = _load_progress(work_dir, key)
+    layers = progress["layers"]
+
+    if not layers:
+        write_records(layer_path(work_dir, 0), [start << 8 | blank])
+        layers.append(1)
+        _save_progress(work_dir, progress)
+        if on_layer is not None:
+            on_layer(0, 1)
+
+    while not progress["finished"] and (max_depth is None or len(layers) <= max_depth):
+        depth = len(layers) - 1
+        parents = read_records(layer_path(work_dir, depth), progress["parents_done"])
+        done = progress["parents_done"]
+        buffer = []
+        for code in parents:
+            state, blank = code >> 8, code & 0xFF
+            blank_shift = bits * blank
+            for _, to in moves[blank]:
+                tile = (state >> (bits * to)) & mask
+                child = state - (tile << (bits * to)) + (tile << blank_shift)
+                buffer.append(child << 8 | to)
+            done += 1
+            if len(buffer) >= buffer_boards:
+                buffer.sort()
+                write_records(run_path(work_dir, progress["runs"]), _unique(buffer))
+                progress["runs"] += 1
+                progress["parents_done"] = done
+                _save_progress(work_dir, progress)
+                buffer = []
+        if buffer:
+            buffer.sort()
+            write_records(run_path(work_dir, progress["runs"]), _unique(buffer))
+            progress["runs"] += 1
+            progress["parents_done"] = done
+            _save_progress(work_dir, progress)
+
+        runs = [run_path(work_dir, r) for r in range(progress["runs"])]
+        children = _unique(heapq.merge(*(read_records(run) for run in runs)))
+        children = _without(children, read_records(layer_path(work_dir, depth)))
+        if depth > 0:
+            children = _without(children, read_records(layer_path(work_dir, depth - 1)))
+        boards = write_records(layer_path(work_dir, depth + 1), children)
+        if boards == 0:
+            os.remove(layer_path(work_dir, depth + 1))
+        else:
+            layers.append(boards)
+        progress["parents_done"] = 0
+        progress["runs"] = 0
+        progress["finished"] = boards == 0
+        _save_progress(work_dir, progress)
+        for run in runs:
+            os.remove(run)
+        if boards == 0:
+            break
+        if on_layer is not None:
+            on_layer(depth + 1, boards)
+    return layers
+
+
+def layer_sizes(work_dir: str) -> list:
+    """the number of boards on each finished layer of the search in work_dir"""
+    with open(os.path.join(work_dir, PROGRESS)) as file:
+        return json.load(file)["layers"]
+
+
+def iter_layer(work_dir: str, depth: int):
+    """yields (packed board, blank cell) for every board on a layer, in order"""
+    for code in read_records(layer_path(work_dir, depth)):
+        yield code >> 8, code & 0xFF
+
+
+class DistanceTable(object):
+    """
+    The exact distance of every board an external_bfs() search reached, looked
+    up by binary search in the memory-mapped layer files. For a search from the
+    goal this is a perfect heuristic, and for a search over a smaller board it
+    is a table to build heuristics from.
+    """
+
+    def __init__(self, work_dir: str):
+        self.width = record_width()
+        self.files = []
+        self.layers = []
+        for depth, boards in enumerate(layer_sizes(work_dir)):
+            file = open(layer_path(work_dir, depth), "rb")
+            self.files.append(file)
+            self.layers.append(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def distance(self, state: int):
+        """the depth of a packed board, or None if the search never reached it"""
+        for depth, records in enumerate(self.layers):
+            if self._contains(records, state):
+                return depth
+        return None
+
+    def _contains(self, records, state: int) -> bool:
+        width = self.width
+        low, high = 0, len(records) // width
+        while low < high:
+            middle = (low + high) // 2
+            at = middle * width
+            if int.from_bytes(records[at : at + width], "big") >> 8 < state:
+                low = middle + 1
+            else:
+                high = middle
+        at = low * width
+        return at < len(records) and int.from_bytes(records[at : at + width], "big") >> 8 == state
+
+    def close(self) -> None:
+        for records in self.layers:
+            records.close()
+        for file in self.files:
+            file.close()
+
+
+def stream_to_collectors(work_dir: str, collectors: list) -> None:
+    """
+    Passes every finished layer to state_space.py collectors, IO_RECORDS boards
+    at a time, with the inversion counts they expect
+    """
+    import state_space
+
+    for depth in range(len(layer_sizes(work_dir))):
+        states = []
+        for state, _ in iter_layer(work_dir, depth):
+            states.append(state)
+            if len(states) == IO_RECORDS:
+                inversions = [state_space.count_inversions(s) for s in states]
+                for collector in collectors:
+                    collector.add_layer(depth, states, inversions)
+                states = []
+        if states:
+            inversions = [state_space.count_inversions(s) for s in states]
+            for collector in collectors:
+                collector.add_layer(depth, states, inversions)
+
+
+def main() -> None:
+    if len(sys.argv) not in (4, 5, 6):
+        raise Exception(
+            "Error: expected a board file, a variant and a work directory,"
+            " optionally followed by a buffer size and a maximum depth"
+        )
+    if sys.argv[2] not in ["original", "circular", "luddy"]:
+        raise Exception("Error: only 'original', 'circular', and 'luddy' allowed")
+
+    with open(sys.argv[1], "r") as file:
+        board = [[int(i) for i in line.split()] for line in file if line.strip()]
+    solve_luddy.set_size(len(board), len(board[0]))
+    solve_luddy.HEURISTIC = sys.argv[2]
+    start = solve_luddy.PuzzleBoard(board, "", None, True)
+
+    buffer_boards = int(sys.argv[4]) if len(sys.argv) >= 5 else BUFFER_BOARDS
+    max_depth = None
+    if len(sys.argv) == 6 and sys.argv[5] != "-":
+        max_depth = int(sys.argv[5])
+
+    tick = time.perf_counter()
+
+    def report(depth, boards):
+        print("depth %d: %d boards (%.1fs)" % (depth, boards, time.perf_counter() - tick))
+
+    layers = external_bfs(start, sys.argv[3], None, buffer_boards, max_depth, report)
+    print("%d boards on %d layers" % (sum(layers), len(layers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+../search_stats.py
\ No newline at end of file
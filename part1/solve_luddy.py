@@ -6,43 +6,100 @@
 # Based on skeleton code by D. Crandall, September 2019
 #
 import heapq
+from collections import deque
+import multiprocessing
+import os
+import queue
 import sys
 import time
 
+import search_stats  # ../search_stats.py, shared with route.py and choose_team.py
+
 HEURISTIC = None
 GOAL_BOARD = None
-SIZE = 4
-
-_CHESS_CORNER = ((0, 3, 2, 5), (3, 4, 1, 2), (2, 1, 4, 3), (5, 2, 3, 2))
-_CHESS_MID_EDGES = ((3, 0, 3, 2), (2, 3, 2, 1), (1, 2, 1, 4), (2, 3, 2, 3))
-_CHESS_MID_EDGES_T = tuple(zip(*_CHESS_MID_EDGES))
-_CHESS_MID_4 = ((4, 3, 2, 1), (3, 0, 3, 2), (2, 3, 2, 1), (1, 2, 1, 4))
-
-_CHESS_COSTS_LISTS = {
-    (0, 0): _CHESS_CORNER,
-    (1, 0): _CHESS_MID_EDGES,
-    (2, 0): [row[::-1] for row in _CHESS_MID_EDGES],
-    (3, 0): [row[::-1] for row in _CHESS_CORNER],
-    (0, 1): _CHESS_MID_EDGES_T,
-    (1, 1): _CHESS_MID_4,
-    (2, 1): [row[::-1] for row in _CHESS_MID_4],
-    (3, 1): [row[::-1] for row in _CHESS_MID_EDGES_T],
-    (0, 2): _CHESS_MID_EDGES_T[::-1],
-    (1, 2): _CHESS_MID_4[::-1],
-    (2, 2): [row[::-1] for row in _CHESS_MID_4][::-1],
-    (3, 2): [row[::-1] for row in _CHESS_MID_EDGES_T][::-1],
-    (0, 3): _CHESS_CORNER[::-1],
-    (1, 3): _CHESS_MID_EDGES[::-1],
-    (2, 3): [row[::-1] for row in _CHESS_MID_EDGES][::-1],
-    (3, 3): [row[::-1] for row in _CHESS_CORNER][::-1],
+
+# the board's shape, set from the board file by set_size()
+ROWS = 4
+COLS = 4
+
+# the moves of the blank in each variant, by the letter the path records
+_KNIGHT_MOVES = {
+    "A": (-2, -1),
+    "B": (-2, 1),
+    "C": (2, -1),
+    "D": (2, 1),
+    "E": (-1, -2),
+    "F": (-1, 2),
+    "G": (1, -2),
+    "H": (1, 2),
 }
+_SLIDE_MOVES = {"R": (0, -1), "L": (0, 1), "D": (-1, 0), "U": (1, 0)}
+
+# solve_hda() packs a board into an int, _TILE_BITS bits per cell in row-major
+# order, and gives each state to the worker picked by hashing it. Workers send
+# the children they don't own in batches of HDA_BATCH, and check for incoming
+# batches every HDA_EXPANSIONS expansions. HDA_WORKERS of None means one per CPU.
+_TILE_BITS = (ROWS * COLS - 1).bit_length()
+_TILE_MASK = (1 << _TILE_BITS) - 1
+HDA_WORKERS = None
+HDA_BATCH = 64
+HDA_EXPANSIONS = 256
+HDA_POLL = 0.01
+
+# solve_weighted() orders its fringe by g + WEIGHT * h. solve_ara() starts at
+# ARA_WEIGHT and lowers the weight by ARA_STEP after each path it finds.
+WEIGHT = 2.0
+ARA_WEIGHT = 3.0
+ARA_STEP = 0.5
+
+# tile_distances() results by (ROWS, COLS, variant). A tile that can never reach
+# a cell is UNREACHABLE moves away from it, so any board with such a tile out of
+# place sorts after every board that can be solved.
+_DISTANCES = dict()
+UNREACHABLE = 1 << 20
+
+
+def set_size(rows: int, cols: int) -> None:
+    """
+    Sets the board's shape, and with it how many bits a packed board gives a cell
+    :param rows:
+    :param cols:
+    """
+    global ROWS, COLS, _TILE_BITS, _TILE_MASK
+    ROWS, COLS = rows, cols
+    _TILE_BITS = (rows * cols - 1).bit_length()
+    _TILE_MASK = (1 << _TILE_BITS) - 1
+
 
-CHESS_COSTS = dict()
-for key, val in _CHESS_COSTS_LISTS.items():
-    CHESS_COSTS[key] = dict()
-    for y, row in enumerate(val):
-        for x, item in enumerate(row):
-            CHESS_COSTS[key][(x, y)] = item
+def tile_distances(variant=None) -> list:
+    """
+    The fewest moves a single tile needs between any two cells, if it had the
+    board to itself, found by a breadth-first search from every cell over the
+    variant's moves. Every move set is its own reverse, so a tile moves the same
+    way the blank does. Summed over the tiles this is the variant's heuristic:
+    manhattan distance, manhattan distance with wraparound, or knight-move
+    distance. Built once per board shape and variant.
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :return: flat list, the distance from cell a to cell b at a * ROWS * COLS + b
+    """
+    variant = variant or HEURISTIC
+    key = (ROWS, COLS, variant)
+    if key not in _DISTANCES:
+        cells = ROWS * COLS
+        moves = move_table(variant)
+        table = [UNREACHABLE] * (cells * cells)
+        for source in range(cells):
+            table[source * cells + source] = 0
+            frontier = deque([source])
+            while frontier:
+                cell = frontier.popleft()
+                steps = table[source * cells + cell] + 1
+                for _, to in moves[cell]:
+                    if table[source * cells + to] == UNREACHABLE:
+                        table[source * cells + to] = steps
+                        frontier.append(to)
+        _DISTANCES[key] = table
+    return _DISTANCES[key]
 
 
 def quantify_list_to_dict(board_blocks_list: list) -> dict:
@@ -144,10 +201,10 @@ class PuzzleBoard:
         :return: stringified PuzzleBoard instance
         """
         array = []
-        for x in range(SIZE):
+        for x in range(ROWS):
             # print("y:",y)
             row = []
-            for y in range(SIZE):
+            for y in range(COLS):
                 # print("x:",x)
                 for block in self.board_blocks.items():
                     # print(block)
@@ -180,9 +237,9 @@ class PuzzleBoard:
         estimate = 0
         for i in range(1, len(self.board_blocks)):
             x = abs(self.board_blocks[i][0] - other.board_blocks[i][0])
-            estimate += 4 - x if x > 2 else x
+            estimate += min(x, ROWS - x)
             y = abs(self.board_blocks[i][1] - other.board_blocks[i][1])
-            estimate += 4 - y if y > 2 else y
+            estimate += min(y, COLS - y)
         return estimate
 
     def _estimate_chess_horse_dist(self, other: "PuzzleBoard") -> int:
@@ -191,8 +248,14 @@ class PuzzleBoard:
         :param other:
         :return: estimated distance
         """
+        distances = tile_distances("luddy")
+        cells = ROWS * COLS
         return sum(
-            CHESS_COSTS[self.board_blocks[i]][other.board_blocks[i]]
+            distances[
+                (self.board_blocks[i][0] * COLS + self.board_blocks[i][1]) * cells
+                + other.board_blocks[i][0] * COLS
+                + other.board_blocks[i][1]
+            ]
             for i in range(1, len(self.board_blocks))
         )
 
@@ -203,20 +266,7 @@ class PuzzleBoard:
         :return: list of possible successors
         """
         successors = list()
-        moves = (
-            {
-                "A": (-2, -1),
-                "B": (-2, 1),
-                "C": (2, -1),
-                "D": (2, 1),
-                "E": (-1, -2),
-                "F": (-1, 2),
-                "G": (1, -2),
-                "H": (1, 2),
-            }
-            if HEURISTIC == "luddy"
-            else {"R": (0, -1), "L": (0, 1), "D": (-1, 0), "U": (1, 0)}
-        )
+        moves = _KNIGHT_MOVES if HEURISTIC == "luddy" else _SLIDE_MOVES
 
         location_of_zero = self.board_blocks[0]
 
@@ -231,16 +281,16 @@ class PuzzleBoard:
             if HEURISTIC == "circular":
                 # We're allowing circular, move back onto board
                 new_location_of_zero = (
-                    new_location_of_zero[0] % SIZE,
-                    new_location_of_zero[1] % SIZE,
+                    new_location_of_zero[0] % ROWS,
+                    new_location_of_zero[1] % COLS,
                 )
 
             # skip this state if we've moved off the board
             if (
                 new_location_of_zero[0] < 0
                 or new_location_of_zero[1] < 0
-                or new_location_of_zero[0] > SIZE - 1
-                or new_location_of_zero[1] > SIZE - 1
+                or new_location_of_zero[0] > ROWS - 1
+                or new_location_of_zero[1] > COLS - 1
             ):
                 continue
 
@@ -258,16 +308,31 @@ class PuzzleBoard:
         self.valid = False
 
 
-def solve(initial_board: PuzzleBoard, goal_board: PuzzleBoard):
+def solve(initial_board: PuzzleBoard, goal_board: PuzzleBoard, cache=None):
     """
     Function where the magic happens
     :param initial_board: Start instance
     :param goal_board: Goal instance
+    :param cache: a board_cache.BoardCache. A neighbor with a cached distance
+                  gets that distance as its heuristic, and once one is popped
+                  the rest of its path is read from the cache. The new
+                  neighbors of each expanded board are looked up in one query.
     :return: list of path taken or False if solution not found
     """
     # The dictionary of states already evaluated
     evaluated_states = dict()
 
+    # The boards found in the cache, with a known distance to the goal. Their
+    # f-cost is exact, so the first one popped lies on a shortest path. A cache
+    # with nothing for this puzzle isn't asked again.
+    puzzle = cache_key(goal_board) if cache is not None else None
+    lookups = cache is not None and cache.holds(puzzle)
+    exact = set()
+    if lookups and cache.distances(puzzle, [pack(initial_board)]):
+        exact.add(initial_board)
+
+    stats = search_stats.ACTIVE
+
     # The heap of currently discovered state that are not evaluated yet.
     # Obviously, only the start state is known initially.
     fringe = [initial_board]
@@ -280,9 +345,15 @@ def solve(initial_board: PuzzleBoard, goal_board: PuzzleBoard):
         current = heapq.heappop(fringe)  # Pop the lowest f-cost state off.
 
         if not current.valid:
+            if stats is not None:
+                stats.count(stale=1)
             continue  # Skip if invalid
 
         del fringe_map[current]
+        if current in exact:
+            rest = cache.lookup(puzzle, pack(current))
+            if rest is not None:
+                current = replay(current, rest)[-1]
         # If we've reached the goal:
         if current == goal_board:
             # return the list of states it took to get there.
@@ -300,9 +371,13 @@ def solve(initial_board: PuzzleBoard, goal_board: PuzzleBoard):
         evaluated_states[current] = True
 
         # For each possible neighbor of our current state,
-        for neighbor in current.get_successors():
+        successors = current.get_successors()
+        duplicates = 0
+        fresh = []
+        for neighbor in successors:
             # Skip it if it's already been evaluated
             if neighbor in evaluated_states:
+                duplicates += 1
                 continue
 
             if neighbor in fringe_map:
@@ -312,27 +387,478 @@ def solve(initial_board: PuzzleBoard, goal_board: PuzzleBoard):
                     # Found a better path, remove old entry from fringe
                     match.invalidate()
                     del fringe_map[neighbor]
+                else:
+                    duplicates += 1
 
             if neighbor not in fringe_map:
-                # Add it to our open heap
-                heapq.heappush(fringe, neighbor)
+                fresh.append(neighbor)
                 fringe_map[neighbor] = neighbor
+
+        if lookups and fresh:
+            states = [pack(neighbor) for neighbor in fresh]
+            found = cache.distances(puzzle, states)
+            for neighbor, state in zip(fresh, states):
+                distance = found.get(state)
+                if distance is not None:
+                    neighbor.h_cost = distance
+                    neighbor.f_cost = neighbor.g_cost + distance
+                    exact.add(neighbor)
+        # Add them to our open heap
+        for neighbor in fresh:
+            heapq.heappush(fringe, neighbor)
+
+        if stats is not None:
+            stats.count(
+                len(fringe_map),
+                len(evaluated_states),
+                expanded=1,
+                generated=len(successors),
+                duplicates=duplicates,
+            )
     return False
 
 
-def is_solvable(puzzle_board: list) -> bool:
+def pack(board: PuzzleBoard) -> int:
+    """
+    Packs a board into an int, the tile on cell i in bits
+    [i * _TILE_BITS, (i + 1) * _TILE_BITS), cells numbered row by row
+    :param board:
+    :return: the packed board
+    """
+    state = 0
+    for tile, (row, col) in board.board_blocks.items():
+        state |= tile << (_TILE_BITS * (row * COLS + col))
+    return state
+
+
+def cache_key(goal_board: PuzzleBoard) -> tuple:
+    """the puzzle a board_cache.BoardCache files the current variant's boards under"""
+    return HEURISTIC, ROWS, COLS, pack(goal_board)
+
+
+def move_table(variant=None) -> list:
+    """
+    The moves of the blank in a variant, from every cell
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :return: list by cell of (letter, cell the blank moves to)
+    """
+    variant = variant or HEURISTIC
+    moves = _KNIGHT_MOVES if variant == "luddy" else _SLIDE_MOVES
+    table = []
+    for cell in range(ROWS * COLS):
+        row, col = divmod(cell, COLS)
+        targets = []
+        for letter, (d_row, d_col) in moves.items():
+            to_row, to_col = row + d_row, col + d_col
+            if variant == "circular":
+                to_row, to_col = to_row % ROWS, to_col % COLS
+            if 0 <= to_row < ROWS and 0 <= to_col < COLS:
+                targets.append((letter, to_row * COLS + to_col))
+        table.append(tuple(targets))
+    return table
+
+
+def heuristic_table(goal_board: PuzzleBoard) -> list:
+    """
+    The current variant's heuristic for every tile on every cell, so the
+    heuristic of a packed board is a sum of lookups that a move changes by two
+    :param goal_board:
+    :return: flat list, the estimate for tile t on cell c at t * ROWS * COLS + c
+    """
+    cells = ROWS * COLS
+    distances = tile_distances()
+    table = [0] * (cells * cells)
+    for tile, (goal_row, goal_col) in goal_board.board_blocks.items():
+        if tile == 0:
+            continue
+        goal = goal_row * COLS + goal_col
+        for cell in range(cells):
+            table[tile * cells + cell] = distances[cell * cells + goal]
+    return table
+
+
+def packed_start(board: PuzzleBoard, table: list) -> tuple:
+    """
+    A board packed for the packed solvers, with where its blank is and its
+    heuristic from heuristic_table()
+    :return: (packed board, blank cell, heuristic)
+    """
+    state = pack(board)
+    cells = ROWS * COLS
+    tiles = [(state >> (_TILE_BITS * cell)) & _TILE_MASK for cell in range(cells)]
+    return state, tiles.index(0), sum(table[t * cells + c] for c, t in enumerate(tiles))
+
+
+def _owner(state: int, workers: int) -> int:
+    """the worker that owns a packed board, from a mixed hash so they spread evenly"""
+    return (((hash(state) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % workers
+
+
+def _hda_worker(index, inboxes, results, sent, received, idle, incumbent, stop, setup):
+    """
+    One HDA* worker. It runs A* over the states it owns: children it owns go
+    straight onto its own fringe, the rest are batched up for their owners.
+    Anything whose f-cost can't beat the incumbent is dropped. The worker marks
+    itself idle only once it has nothing left worth expanding and has sent
+    every batch it was holding.
+    """
+    moves, table, goal, shape = setup
+    set_size(*shape)  # in case the worker was started fresh rather than forked
+    inbox = inboxes[index]
+    workers = len(inboxes)
+    cells = ROWS * COLS
+    best_g = dict()
+    fringe = []
+    outboxes = [[] for _ in range(workers)]
+
+    def receive(batch):
+        for state, blank, g, h, path in batch:
+            if best_g.get(state, g + 1) <= g:
+                continue
+            best_g[state] = g
+            heapq.heappush(fringe, (g + h, h, state, blank, g, path))
+
+    def send(owner):
+        # counted before it is put, so a batch is never in flight uncounted
+        sent[index] += 1
+        inboxes[owner].put(outboxes[owner])
+        outboxes[owner] = []
+
+    while not stop.is_set():
+        try:
+            while True:
+                batch = inbox.get_nowait()
+                idle[index] = 0
+                receive(batch)
+                received[index] += 1
+        except queue.Empty:
+            pass
+
+        expanded = 0
+        while fringe and expanded < HDA_EXPANSIONS:
+            f, h, state, blank, g, path = heapq.heappop(fringe)
+            if f >= incumbent.value:
+                fringe.clear()  # the rest of the heap can't do better either
+                break
+            if g > best_g[state]:
+                continue  # a better path to it was found after this was pushed
+            expanded += 1
+            if state == goal:
+                with incumbent.get_lock():
+                    if g < incumbent.value:
+                        incumbent.value = g
+                        results.put((g, path))
+                continue
+            for letter, to in moves[blank]:
+                shift = _TILE_BITS * to
+                tile = (state >> shift) & _TILE_MASK
+                child = state - (tile << shift) + (tile << (_TILE_BITS * blank))
+                child_h = h - table[tile * cells + to] + table[tile * cells + blank]
+                if g + 1 + child_h >= incumbent.value:
+                    continue
+                item = (child, to, g + 1, child_h, path + letter)
+                owner = _owner(child, workers)
+                if owner == index:
+                    receive((item,))
+                else:
+                    outboxes[owner].append(item)
+                    if len(outboxes[owner]) >= HDA_BATCH:
+                        send(owner)
+
+        for owner in range(workers):
+            if outboxes[owner]:
+                send(owner)
+        if not fringe:
+            idle[index] = 1
+            try:
+                batch = inbox.get(timeout=HDA_POLL)
+            except queue.Empty:
+                continue
+            idle[index] = 0
+            receive(batch)
+            received[index] += 1
+
+
+def solve_hda(initial_board: PuzzleBoard, goal_board: PuzzleBoard, workers=None):
+    """
+    Hash-distributed A* (HDA*) over worker processes. Each packed board belongs
+    to one worker, picked by its hash, so duplicate detection stays local and
+    the only traffic is batches of children. The first goal a worker expands
+    becomes the incumbent, and every worker keeps going until nobody has a
+    state with a lower f-cost. That is when this process sees every worker idle
+    and as many batches received as sent, twice running with the same counts
+    (a batch is counted as sent before it is put, and as received only once it
+    is on the owner's fringe), so with an admissible heuristic the incumbent
+    is optimal.
+    :param initial_board: Start instance
+    :param goal_board: Goal instance
+    :param workers: number of worker processes, HDA_WORKERS if None
+    :return: the path as a string of move letters, or False if there is none
+    """
+    if workers is None:
+        workers = HDA_WORKERS or os.cpu_count() or 1
+    moves = move_table()
+    table = heuristic_table(goal_board)
+    start, blank, h = packed_start(initial_board, table)
+
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    results = multiprocessing.Queue()
+    # the last sent slot is this process's, for the batch holding the start
+    sent = multiprocessing.RawArray("q", workers + 1)
+    received = multiprocessing.RawArray("q", workers)
+    idle = multiprocessing.RawArray("b", workers)
+    incumbent = multiprocessing.Value("q", 1 << 62)
+    stop = multiprocessing.Event()
+    sent[workers] = 1
+    inboxes[_owner(start, workers)].put([(start, blank, 0, h, "")])
+    setup = (moves, table, pack(goal_board), (ROWS, COLS))
+    processes = [
+        multiprocessing.Process(
+            target=_hda_worker,
+            args=(i, inboxes, results, sent, received, idle, incumbent, stop, setup),
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    best = None
+    last = None
+    while True:
+        time.sleep(HDA_POLL)
+        # received first: it never runs ahead of sent, so equal counts mean
+        # nothing was in flight in between
+        counts = sum(received), all(idle), sum(sent)
+        if counts[1] and counts[0] == counts[2] and counts == last:
+            break
+        last = counts
+
+    stop.set()
+    for process in processes:
+        process.join()
+    while True:
+        try:
+            found = results.get(timeout=HDA_POLL)
+        except queue.Empty:
+            break
+        if best is None or found[0] < best[0]:
+            best = found
+    return False if best is None else best[1]
+
+
+def _walk_back(parents: dict, state: int) -> str:
+    """the path to a state, from the (parent, letter) the packed solvers record"""
+    letters = []
+    while parents[state][0] is not None:
+        state, letter = parents[state]
+        letters.append(letter)
+    return "".join(reversed(letters))
+
+
+def solve_weighted(initial_board: PuzzleBoard, goal_board: PuzzleBoard, weight=WEIGHT):
+    """
+    Weighted A* over packed boards: the fringe is ordered by g + weight * h, so
+    it dives towards the goal and finds a path much sooner, at most weight
+    times longer than the shortest one. Closed states are never reopened.
+    :param initial_board: Start instance
+    :param goal_board: Goal instance
+    :param weight: at least 1; 1 is plain A*
+    :return: the path as a string of move letters, or False if there is none
+    """
+    moves = move_table()
+    table = heuristic_table(goal_board)
+    cells = ROWS * COLS
+    start, blank, h = packed_start(initial_board, table)
+    goal = pack(goal_board)
+    best_g = {start: 0}
+    parents = {start: (None, "")}
+    closed = set()
+    fringe = [(weight * h, h, start, blank)]
+    stats = search_stats.ACTIVE
+    while fringe:
+        _, h, state, blank = heapq.heappop(fringe)
+        if state in closed:
+            if stats is not None:
+                stats.count(stale=1)
+            continue
+        if state == goal:
+            return _walk_back(parents, state)
+        closed.add(state)
+        g = best_g[state] + 1
+        duplicates = 0
+        for letter, to in moves[blank]:
+            shift = _TILE_BITS * to
+            tile = (state >> shift) & _TILE_MASK
+            child = state - (tile << shift) + (tile << (_TILE_BITS * blank))
+            if child in closed or best_g.get(child, g + 1) <= g:
+                duplicates += 1
+                continue
+            child_h = h - table[tile * cells + to] + table[tile * cells + blank]
+            best_g[child] = g
+            parents[child] = (state, letter)
+            heapq.heappush(fringe, (g + weight * child_h, child_h, child, to))
+        if stats is not None:
+            stats.count(
+                len(fringe),
+                len(closed),
+                expanded=1,
+                generated=len(moves[blank]),
+                duplicates=duplicates,
+            )
+    return False
+
+
+def solve_ara(
+    initial_board: PuzzleBoard,
+    goal_board: PuzzleBoard,
+    time_limit=None,
+    weight=ARA_WEIGHT,
+    on_improve=None,
+):
+    """
+    Anytime repairing A* (ARA*, Likhachev, Gordon and Thrun 2003). A weighted
+    A* search finds a first path quickly. The weight is then lowered by
+    ARA_STEP and the search carries on from where it stopped instead of
+    starting over: states whose cost improved after they were expanded are put
+    back on the fringe, which is re-sorted for the new weight, and only those
+    get expanded again. Each search ends once nothing on the fringe could give
+    a shorter path at the current weight. It is repeated until the weight is 1,
+    which proves the path optimal, or time_limit runs out.
+    A path is only known to be within a factor of the shortest: the smaller of
+    the weight and its length over the lowest g + h still waiting to be
+    expanded.
+    :param initial_board: Start instance
+    :param goal_board: Goal instance
+    :param time_limit: seconds after which no new search is started and the
+                       current one stops, once the first path is found
+    :param weight: the first search's weight
+    :param on_improve: called with (path, bound) for each shorter path found
+    :return: (path, bound) for the shortest path found, or (False, None) if
+             there is none
+    """
+    moves = move_table()
+    table = heuristic_table(goal_board)
+    cells = ROWS * COLS
+    start, blank, h = packed_start(initial_board, table)
+    goal = pack(goal_board)
+    tick = time.perf_counter()
+    best_g = {start: 0}
+    h_of = {start: h}
+    parents = {start: (None, "")}
+    # states waiting to be expanded (by blank cell), on the fringe or, if they
+    # were already expanded in this search, held back for the next one
+    waiting = {start: blank}
+    held = dict()
+    closed = set()
+    fringe = [(weight * h, h, start, blank)]
+    best = (False, None)
+    expanded = 0
+
+    while True:
+        stopped = False
+        while fringe:
+            key, h, state, blank = fringe[0]
+            goal_g = best_g.get(goal)
+            if goal_g is not None and goal_g <= key:
+                break
+            if (
+                expanded % 1024 == 0
+                and best[0] is not False
+                and time_limit is not None
+                and time.perf_counter() - tick > time_limit
+            ):
+                stopped = True
+                break
+            heapq.heappop(fringe)
+            if state in closed or waiting.get(state) is None:
+                continue
+            del waiting[state]
+            closed.add(state)
+            expanded += 1
+            g = best_g[state] + 1
+            for letter, to in moves[blank]:
+                shift = _TILE_BITS * to
+                tile = (state >> shift) & _TILE_MASK
+                child = state - (tile << shift) + (tile << (_TILE_BITS * blank))
+                if best_g.get(child, g + 1) <= g:
+                    continue
+                child_h = h - table[tile * cells + to] + table[tile * cells + blank]
+                best_g[child] = g
+                h_of[child] = child_h
+                parents[child] = (state, letter)
+                if child in closed:
+                    held[child] = to
+                else:
+                    waiting[child] = to
+                    heapq.heappush(fringe, (g + weight * child_h, child_h, child, to))
+
+        goal_g = best_g.get(goal)
+        if goal_g is None:
+            return best
+        lowest = min(
+            (best_g[s] + h_of[s] for s in (*waiting, *held)),
+            default=goal_g,
+        )
+        bound = max(1.0, min(weight, goal_g / lowest)) if lowest > 0 else 1.0
+        if best[0] is False or goal_g < len(best[0]):
+            best = (_walk_back(parents, goal), bound)
+            if on_improve is not None:
+                on_improve(*best)
+        elif bound < best[1]:
+            best = (best[0], bound)
+        if stopped or weight <= 1 or bound <= 1:
+            return best
+        if time_limit is not None and time.perf_counter() - tick > time_limit:
+            return best
+
+        weight = max(1.0, weight - ARA_STEP)
+        waiting.update(held)
+        held = dict()
+        closed = set()
+        fringe = [
+            (best_g[s] + weight * h_of[s], h_of[s], s, blank)
+            for s, blank in waiting.items()
+        ]
+        heapq.heapify(fringe)
+
+
+def replay(initial_board: PuzzleBoard, path: str) -> list:
+    """
+    The boards along a path of move letters
+    :param initial_board: Start instance
+    :param path: string of move letters
+    :return: list of PuzzleBoard, from initial_board to the end of the path
+    """
+    states = [initial_board]
+    for letter in path:
+        states.append(
+            next(s for s in states[-1].get_successors() if s.path[-1] == letter)
+        )
+    return states
+
+
+def is_solvable(puzzle_board: list, variant=None) -> bool:
     """
     Checks whether a puzzle grid is odd or even and if it solvable depending on
     the number of inversions as explained here:
     https://www.cs.bham.ac.uk/~mdr/teaching/modules04/java2/TilesSolvability.html
 
-    :param puzzle_board: the puzzle board as a 1D list
-    :return: a flag indicating whether the puzzle board instance is solvable
+    Knight moves keep the same invariant on any board, and so do wraparound
+    moves when both sides are even, so a board that fails it can't be solved.
+    Passing is only enough for the original moves, though: the solvers report
+    any other board that turns out to have no path.
+    :param puzzle_board: the puzzle board as a 1D list, COLS to a row
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :return: False if the board can't be solved, True if it may be
     """
-    import math
+    variant = variant or HEURISTIC
+    if variant == "circular" and (ROWS % 2 or COLS % 2):
+        # wrapping around an odd side flips the parity, so nothing is ruled out
+        return True
 
     parity = 0
-    width = math.sqrt(len(puzzle_board))
+    width = COLS
+    rows = len(puzzle_board) // width
     row = 0
     row_with_zero = 0
 
@@ -348,8 +874,10 @@ def is_solvable(puzzle_board: list) -> bool:
             ):
                 parity += 1
 
+    # on an even grid each move up or down changes the parity, and the blank
+    # ends on the bottom row
     return (
-        (parity % 2 == 0 if row_with_zero % 2 == 0 else parity % 2 != 0)
+        (parity + rows - row_with_zero) % 2 == 0
         if width % 2 == 0  # even grid
         else parity % 2 == 0  # odd grid
     )
@@ -366,18 +894,57 @@ def two_d_to_one_d(arr: list) -> list:
 
 # Main event
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        raise (Exception("Error: expected 2 arguments"))
+    # --cache=file looks the board up in a board_cache.py store first, and adds
+    # every board on an optimal path to it
+    cache_path = None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--cache="):
+            cache_path = arg[len("--cache=") :]
+    sys.argv = [arg for arg in sys.argv if not arg.startswith("--cache=")]
+    sys.argv = search_stats.parse_flags(sys.argv)
+
+    if len(sys.argv) not in (3, 4, 5, 6):
+        raise (
+            Exception(
+                "Error: expected 2 arguments, optionally followed by a solver"
+                " and its options"
+            )
+        )
 
     if sys.argv[2] not in ["original", "circular", "luddy"]:
         raise (Exception("Error: only 'original', 'circular', and 'luddy' allowed"))
 
+    # hda takes a number of workers, weighted a weight, and ara a time limit in
+    # seconds ("-" for none) and then optionally its first weight
+    solver = sys.argv[3] if len(sys.argv) >= 4 else "astar"
+    if solver not in ["astar", "hda", "weighted", "ara"]:
+        raise (
+            Exception(
+                "Error: only 'astar', 'hda', 'weighted' and 'ara' allowed as solver"
+            )
+        )
+    if len(sys.argv) >= 5 and solver == "astar":
+        raise (Exception("Error: 'astar' takes no options"))
+    if len(sys.argv) == 6 and solver != "ara":
+        raise (Exception("Error: only 'ara' takes two options"))
+
     HEURISTIC = sys.argv[2]
 
-    with open(sys.argv[1], "r") as file:
+    with search_stats.phase("parse"), open(sys.argv[1], "r") as file:
         start_state = []
         for line in file:
-            start_state += [[int(i) for i in line.split()]]
+            if line.strip():
+                start_state += [[int(i) for i in line.split()]]
+
+    if len(set(len(row) for row in start_state)) != 1:
+        raise (Exception("Error: every row of the board must be the same length"))
+    set_size(len(start_state), len(start_state[0]))
+    if sorted(two_d_to_one_d(start_state)) != list(range(ROWS * COLS)):
+        raise (
+            Exception(
+                "Error: the board must hold 0 to %d once each" % (ROWS * COLS - 1)
+            )
+        )
 
     # start_state = [
     #     [1, 2, 3, 4],
@@ -422,34 +989,84 @@ if __name__ == "__main__":
     #     [13, 14, 15, 4],
     # ]  # To test circular 2
 
+    # the requested goal state: tiles in order, row by row, with the blank last
     goal_state = [
-        [1, 2, 3, 4],
-        [5, 6, 7, 8],
-        [9, 10, 11, 12],
-        [13, 14, 15, 0],
-    ]  # the requested goal state
+        [(row * COLS + col + 1) % (ROWS * COLS) for col in range(COLS)]
+        for row in range(ROWS)
+    ]
 
-    goal = PuzzleBoard(goal_state, "", None, True)
-    GOAL_BOARD = goal
-    start = PuzzleBoard(start_state, "", None)
+    with search_stats.phase("setup"):
+        goal = PuzzleBoard(goal_state, "", None, True)
+        GOAL_BOARD = goal
+        start = PuzzleBoard(start_state, "", None)
+        solvable = is_solvable(puzzle_board=two_d_to_one_d(start_state))
 
     print("Solving...")
 
-    if not is_solvable(puzzle_board=two_d_to_one_d(start_state)):
+    if not solvable:
         print("Inf")
 
     else:
         tick = time.time()
+        cache = None
+        cached = None
+        optimal = solver in ("astar", "hda")
+        if cache_path is not None:
+            from board_cache import BoardCache
+
+            cache = BoardCache(cache_path)
+            cached = cache.lookup(cache_key(goal), pack(start))
         # the main thing
-        states = solve(start, goal)
-
-        # Found the solution, let's print the original puzzle first
-        print("Original Board: \n{0}".format(states[0].to_string()))
-
-        # Now the following intermediate steps
-        for state in states[1:]:
-            print("\t |\n\t |\n\t |\n\t\\./")
-            print(state.to_string())
-
-        print("\nTime taken: {0}s".format(round((time.time() - tick), 4)))
-        print("Path taken: \n{0}".format(states[-1].path))
+        with search_stats.phase("search"):
+            # the packed solvers return the path, or False if the goal can't be
+            # reached, which the parity check doesn't rule out for every variant
+            path = False
+            if cached is not None:
+                path = cached
+            elif solver == "hda":
+                workers = int(sys.argv[4]) if len(sys.argv) == 5 else None
+                path = solve_hda(start, goal, workers)
+            elif solver == "weighted":
+                weight = float(sys.argv[4]) if len(sys.argv) == 5 else WEIGHT
+                path = solve_weighted(start, goal, weight)
+            elif solver == "ara":
+
+                def report(path, bound):
+                    print(
+                        "path of {0} moves after {1}s, at most {2:.3f} times the"
+                        " shortest".format(
+                            len(path), round(time.time() - tick, 4), bound
+                        ),
+                        file=sys.stderr,
+                    )
+
+                limit = None
+                if len(sys.argv) >= 5 and sys.argv[4] != "-":
+                    limit = float(sys.argv[4])
+                weight = float(sys.argv[5]) if len(sys.argv) == 6 else ARA_WEIGHT
+                path, bound = solve_ara(start, goal, limit, weight, report)
+                optimal = bound is not None and bound <= 1
+            if solver == "astar" and cached is None:
+                states = solve(start, goal, cache)
+            else:
+                states = replay(start, path) if path is not False else False
+
+        if cache is not None:
+            if states and cached is None and optimal:
+                cache.store(cache_key(goal), [pack(s) for s in states], states[-1].path)
+            cache.close()
+
+        with search_stats.phase("output"):
+            if not states:
+                print("Inf")
+            else:
+                # Found the solution, let's print the original puzzle first
+                print("Original Board: \n{0}".format(states[0].to_string()))
+
+                # Now the following intermediate steps
+                for state in states[1:]:
+                    print("\t |\n\t |\n\t |\n\t\\./")
+                    print(state.to_string())
+
+                print("\nTime taken: {0}s".format(round((time.time() - tick), 4)))
+                print("Path taken: \n{0}".format(states[-1].path))
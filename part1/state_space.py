@@ -0,0 +1,304 @@
+#!/usr/local/bin/python3
+#
+# state_space.py : Breadth-first statistics over a puzzle variant's state space
+#
+# Usage: ./state_space.py board variant [max-states|-] [collectors]
+#
+# Dans_horsing_around.py gathered inversion counts by running A* and rewriting
+# the whole CSV for every neighbor it generated. This enumerates the boards
+# reachable from the board in the file, layer by layer, on boards packed the way
+# solve_luddy.py packs them. Every move can be undone, so a board's neighbors
+# are all in the layer before it, its own layer or the layer after it, and only
+# those three layers are kept. Each layer is handed to the collectors, which
+# keep counters rather than rows. Their CSV files are rewritten at most every
+# FLUSH_SECONDS and once more at the end, when the histograms are also saved as
+# .npy files if NumPy is installed. collectors is a comma-separated list
+# of depth, inversions and log, and defaults to depth,inversions.
+#
+import collections
+import csv
+import os
+import sys
+import time
+
+import solve_luddy
+
+try:
+    import numpy
+except ImportError:  # only the .npy copies of the histograms need it
+    numpy = None
+
+# how often the collectors' files are brought up to date during a run
+FLUSH_SECONDS = 10.0
+
+# the per-board log is written this many rows at a time
+LOG_ROWS = 1 << 16
+
+
+class Collector(object):
+    """
+    Something explore() hands each finished layer to. Subclasses override
+    add_layer(), and flush() and save_numpy() too if they keep a file, which is
+    named after name.
+    """
+
+    name = None
+
+    def add_layer(self, depth: int, states: list, inversions: list) -> None:
+        """takes one layer: its depth, its packed boards and their inversion counts"""
+
+    def flush(self, prefix: str) -> None:
+        """brings the collector's file up to date"""
+
+    def save_numpy(self, prefix: str) -> None:
+        """saves what was collected as .npy, if the collector has anything to save"""
+
+    def close(self) -> None:
+        """called once, after the last flush()"""
+
+
+class Histogram(Collector):
+    """Counts boards by some property of the board, kept in a Counter"""
+
+    header = None
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def rows(self) -> list:
+        return sorted(self.counts.items())
+
+    def flush(self, prefix: str) -> None:
+        """rewrites prefix-name.csv with the counts so far, replacing it in one step"""
+        path = "%s-%s.csv" % (prefix, self.name)
+        with open(path + ".tmp", "w") as output:
+            writer = csv.writer(output, lineterminator="\n")
+            writer.writerow(self.header)
+            writer.writerows(self.rows())
+        os.replace(path + ".tmp", path)
+
+    def save_numpy(self, prefix: str) -> None:
+        """saves the counts as prefix-name.npy, an int64 array of (value, count) rows"""
+        numpy.save(
+            "%s-%s.npy" % (prefix, self.name),
+            numpy.array(self.rows(), dtype=numpy.int64).reshape(-1, 2),
+        )
+
+
+class DepthHistogram(Histogram):
+    """How many boards are each number of moves from the start"""
+
+    name = "depth"
+    header = ("depth", "boards")
+
+    def add_layer(self, depth, states, inversions):
+        self.counts[depth] += len(states)
+
+
+class InversionHistogram(Histogram):
+    """How many boards have each number of inversions among their tiles"""
+
+    name = "inversions"
+    header = ("inversions", "boards")
+
+    def add_layer(self, depth, states, inversions):
+        self.counts.update(inversions)
+
+
+class InversionLog(Collector):
+    """
+    The depth and inversion count of every board, one row each, the way
+    Dans_horsing_around.py wrote them. Rows are buffered and appended LOG_ROWS
+    at a time, so the file only ever grows at its end.
+    """
+
+    name = "log"
+
+    def __init__(self, prefix: str):
+        self.file = open("%s-%s.csv" % (prefix, self.name), "w")
+        self.writer = csv.writer(self.file, lineterminator="\n")
+        self.writer.writerow(("depth", "inversions"))
+        self.buffer = []
+
+    def add_layer(self, depth, states, inversions):
+        for value in inversions:
+            self.buffer.append((depth, value))
+            if len(self.buffer) >= LOG_ROWS:
+                self.writer.writerows(self.buffer)
+                self.buffer = []
+
+    def flush(self, prefix):
+        self.writer.writerows(self.buffer)
+        self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush(None)
+        self.file.close()
+
+
+def move_deltas(variant=None) -> list:
+    """
+    For every cell the blank can be on, the moves out of it, each with the bit
+    offsets a packed board needs to make the move and update its inversion
+    count. The tile that moves jumps over the tiles on the cells between its old
+    and new cell, row by row, and every one of those pairs flips its order.
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :return: list by cell of (cell the blank moves to, its bit offset, bit
+             offsets of the cells in between, 1 if the tile moves forward else -1)
+    """
+    bits = solve_luddy._TILE_BITS
+    table = []
+    for blank, targets in enumerate(solve_luddy.move_table(variant)):
+        moves = []
+        for _, to in targets:
+            low, high = min(blank, to), max(blank, to)
+            between = tuple(bits * cell for cell in range(low + 1, high))
+            moves.append((to, bits * to, between, 1 if to < blank else -1))
+        table.append(tuple(moves))
+    return table
+
+
+def count_inversions(state: int) -> int:
+    """the pairs of tiles on a packed board that are out of order, ignoring the blank"""
+    cells = solve_luddy.ROWS * solve_luddy.COLS
+    tiles = [
+        (state >> (solve_luddy._TILE_BITS * cell)) & solve_luddy._TILE_MASK
+        for cell in range(cells)
+    ]
+    tiles = [tile for tile in tiles if tile]
+    return sum(
+        1
+        for i in range(len(tiles))
+        for j in range(i + 1, len(tiles))
+        if tiles[i] > tiles[j]
+    )
+
+
+def explore(
+    board: solve_luddy.PuzzleBoard,
+    collectors=(),
+    variant=None,
+    max_states=None,
+    max_depth=None,
+    on_flush=None,
+) -> int:
+    """
+    Breadth-first enumeration of every board reachable from board. Each layer
+    is passed to collector.add_layer(depth, states, inversions) as a list of
+    packed boards and a list of their inversion counts. A board's inversion
+    count is its parent's plus the change for the one tile that moved.
+    :param board: the board to start from, at depth 0
+    :param collectors: Collector objects
+    :param variant: 'original', 'circular' or 'luddy', HEURISTIC if None
+    :param max_states: stop after this many boards, None for no limit
+    :param max_depth: stop after this layer, None for no limit
+    :param on_flush: called with no arguments every FLUSH_SECONDS, between layers
+    :return: the number of boards enumerated
+    """
+    moves = move_deltas(variant)
+    bits = solve_luddy._TILE_BITS
+    cells = solve_luddy.ROWS * solve_luddy.COLS
+    mask = solve_luddy._TILE_MASK
+    start = solve_luddy.pack(board)
+    blank = board.board_blocks[0][0] * solve_luddy.COLS + board.board_blocks[0][1]
+
+    # layers map a packed board to its inversion count * cells + its blank cell
+    previous = dict()
+    layer = {start: count_inversions(start) * cells + blank}
+    depth = 0
+    total = 0
+    flushed = time.perf_counter()
+    while layer:
+        if max_states is not None and total + len(layer) > max_states:
+            layer = dict(list(layer.items())[: max_states - total])
+        inversions = [code // cells for code in layer.values()]
+        for collector in collectors:
+            collector.add_layer(depth, list(layer), inversions)
+        total += len(layer)
+        if on_flush is not None and time.perf_counter() - flushed > FLUSH_SECONDS:
+            on_flush()
+            flushed = time.perf_counter()
+        if max_states is not None and total >= max_states:
+            break
+        if max_depth is not None and depth >= max_depth:
+            break
+
+        following = dict()
+        for state, code in layer.items():
+            count, blank = divmod(code, cells)
+            blank_shift = bits * blank
+            for to, shift, between, direction in moves[blank]:
+                tile = (state >> shift) & mask
+                child = state - (tile << shift) + (tile << blank_shift)
+                if child in layer or child in previous or child in following:
+                    continue
+                delta = 0
+                for middle in between:
+                    other = (state >> middle) & mask
+                    delta += 1 if other > tile else -1
+                following[child] = (count + direction * delta) * cells + to
+        previous, layer = layer, following
+        depth += 1
+    return total
+
+
+def make_collectors(names: list, prefix: str) -> list:
+    """the collectors named on the command line, in that order"""
+    collectors = []
+    for name in names:
+        if name == "depth":
+            collectors.append(DepthHistogram())
+        elif name == "inversions":
+            collectors.append(InversionHistogram())
+        elif name == "log":
+            collectors.append(InversionLog(prefix))
+        else:
+            raise Exception("Error: only 'depth', 'inversions' and 'log' allowed")
+    return collectors
+
+
+def main() -> None:
+    if len(sys.argv) not in (3, 4, 5):
+        raise Exception(
+            "Error: expected a board file and a variant, optionally followed by a"
+            " state limit and collectors"
+        )
+    if sys.argv[2] not in ["original", "circular", "luddy"]:
+        raise Exception("Error: only 'original', 'circular', and 'luddy' allowed")
+
+    with open(sys.argv[1], "r") as file:
+        board = [[int(i) for i in line.split()] for line in file if line.strip()]
+    solve_luddy.set_size(len(board), len(board[0]))
+    solve_luddy.HEURISTIC = sys.argv[2]
+    start = solve_luddy.PuzzleBoard(board, "", None, True)
+
+    max_states = None
+    if len(sys.argv) >= 4 and sys.argv[3] != "-":
+        max_states = int(sys.argv[3])
+    names = sys.argv[4].split(",") if len(sys.argv) == 5 else ["depth", "inversions"]
+    prefix = "%s-%s" % (sys.argv[1], sys.argv[2])
+    collectors = make_collectors(names, prefix)
+
+    def flush():
+        for collector in collectors:
+            collector.flush(prefix)
+
+    tick = time.perf_counter()
+    total = explore(start, collectors, max_states=max_states, on_flush=flush)
+    elapsed = time.perf_counter() - tick
+    flush()
+    for collector in collectors:
+        if numpy is not None:
+            collector.save_numpy(prefix)
+        collector.close()
+
+    print(
+        "%d boards in %.3fs, %.0f boards/min"
+        % (total, elapsed, total * 60 / elapsed if elapsed else 0)
+    )
+    print("statistics written to %s-{%s}" % (prefix, ",".join(names)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/local/bin/python3
+#
+# bench_route.py : Reproducible timing of route.py over road-segments.txt
+#
+# Usage: ./bench_route.py results-file [baseline-file]
+#
+# Picks a fixed, seeded set of (start, dest) pairs grouped by how many hops apart
+# they are, runs every cost function and search mode over them, and writes
+# latency percentiles, nodes settled, peak memory and setup time as JSON. Given a
+# baseline from an earlier run, anything that got noticeably worse is flagged.
+#
+from collections import deque
+from contextlib import redirect_stdout
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import route
+
+SEED = 2019
+PAIRS_PER_GROUP = 6
+HOP_GROUPS = ((1, 2), (3, 5), (6, 10), (11, 20), (21, 40))
+COST_FUNCTIONS = ("segments", "distance", "time", "mpg")
+ALTERNATIVES = 5
+
+# the original A* revisits states, so it gets a node budget instead of running for hours
+ASTAR_NODE_LIMIT = 10000
+
+# warm latency is the best of this many runs after the first, to keep scheduler
+# noise out of it; the first run is reported on its own as the cold latency
+REPEATS = 3
+
+# how much worse than the baseline a metric may get before it is flagged, ignoring
+# latency differences too small to tell apart from noise
+REGRESSION_TOLERANCE = 0.2
+NOISE_FLOOR_MS = 1.0
+
+MODES = {
+    "astar": lambda city: route.solve(city),
+    "k-shortest": lambda city: route.k_shortest_routes(city, ALTERNATIVES),
+}
+
+
+def percentiles(values: list) -> dict:
+    """nearest-rank p50/p95/p99 of a list of numbers"""
+    if len(values) == 0:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    return {
+        "p%d" % p: ordered[min(len(ordered) - 1, (len(ordered) * p - 1) // 100)]
+        for p in (50, 95, 99)
+    }
+
+
+def make_pairs() -> dict:
+    """
+    Seeded (start, dest) pairs for every hop group. Destinations must have GPS
+    coordinates because route.py needs them for its heuristic.
+    :return: dict of group label -> list of (start, dest) names
+    """
+    rng = random.Random(SEED)
+    segments = route.parse_segments("road-segments.txt")
+    gps = route.parse_gps("city-gps.txt")
+    names = sorted(segments)
+
+    pairs = {"%d-%d" % group: [] for group in HOP_GROUPS}
+    attempts = 0
+    while any(len(p) < PAIRS_PER_GROUP for p in pairs.values()) and attempts < 10000:
+        attempts += 1
+        start = rng.choice(names)
+        hops = {start: 0}
+        queue = deque([start])
+        while queue:
+            name = queue.popleft()
+            for seg in segments[name]:
+                if seg.to_city not in hops:
+                    hops[seg.to_city] = hops[name] + 1
+                    queue.append(seg.to_city)
+        for low, high in HOP_GROUPS:
+            label = "%d-%d" % (low, high)
+            if len(pairs[label]) >= PAIRS_PER_GROUP:
+                continue
+            dests = sorted(
+                name for name, h in hops.items() if low <= h <= high and name in gps
+            )
+            if dests:
+                pairs[label].append((start, rng.choice(dests)))
+    return pairs
+
+
+def run_query(mode: str, cost: str, start: str, dest: str) -> dict:
+    """
+    Loads the network for one query and times it. The first run pays for the
+    components and the contraction that load() threw away, so it is kept as the cold
+    latency, and the repeats, which reuse them, give the warm latency. A last run
+    under tracemalloc gives the peak memory. The repeats are skipped when the first
+    run ran out of node budget.
+    """
+    tick = time.perf_counter()
+    route.load(start, dest, cost)
+    setup_time = time.perf_counter() - tick
+
+    route.NODE_LIMIT = ASTAR_NODE_LIMIT if mode == "astar" else None
+    route.NODES_SETTLED = 0
+    with redirect_stdout(io.StringIO()):
+        tick = time.perf_counter()
+        result = MODES[mode](route.CITIES[start])
+        cold = time.perf_counter() - tick
+    nodes = route.NODES_SETTLED
+
+    latency = None
+    peak = None
+    if result is not None:
+        for _ in range(REPEATS):
+            route._TREES.clear()  # so k-shortest can't reuse the tree from the last run
+            with redirect_stdout(io.StringIO()):
+                tick = time.perf_counter()
+                MODES[mode](route.CITIES[start])
+                elapsed = time.perf_counter() - tick
+                latency = elapsed if latency is None else min(latency, elapsed)
+        route._TREES.clear()  # so k-shortest can't reuse the tree from the timed run
+        tracemalloc.start()
+        with redirect_stdout(io.StringIO()):
+            MODES[mode](route.CITIES[start])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    route.NODE_LIMIT = None
+
+    return {
+        "setup": setup_time,
+        "cold": cold,
+        "latency": latency,
+        "nodes": nodes,
+        "peak": peak,
+        "over_budget": result is None,
+    }
+
+
+def run_benchmark() -> dict:
+    pairs = make_pairs()
+    results = {}
+    setup_times = []
+    for cost in COST_FUNCTIONS:
+        for mode in MODES:
+            for label, group in pairs.items():
+                runs = [run_query(mode, cost, start, dest) for start, dest in group]
+                setup_times.extend(r["setup"] for r in runs)
+                finished = [r for r in runs if not r["over_budget"]]
+                key = "%s/%s/%s" % (cost, mode, label)
+                results[key] = {
+                    "queries": len(runs),
+                    "over_budget": len(runs) - len(finished),
+                    "cold_latency_ms": percentiles([r["cold"] * 1000 for r in finished]),
+                    "latency_ms": percentiles([r["latency"] * 1000 for r in finished]),
+                    "nodes_settled": percentiles([r["nodes"] for r in finished]),
+                    "peak_kb": max((r["peak"] / 1024 for r in finished), default=None),
+                }
+                cold = results[key]["cold_latency_ms"]["p50"]
+                warm = results[key]["latency_ms"]["p50"]
+                print(
+                    "%-32s p50 cold %10s ms  warm %10s ms   over budget %d"
+                    % (
+                        key,
+                        "-" if cold is None else "%.2f" % cold,
+                        "-" if warm is None else "%.2f" % warm,
+                        len(runs) - len(finished),
+                    )
+                )
+    return {
+        "seed": SEED,
+        "pairs": pairs,
+        "setup_ms": percentiles([t * 1000 for t in setup_times]),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """
+    Lists every metric that is more than REGRESSION_TOLERANCE worse than the baseline
+    :return: list of human-readable regression descriptions
+    """
+    regressions = []
+    checks = [("setup_ms", current["setup_ms"], baseline.get("setup_ms", {}))]
+    for key, result in current["results"].items():
+        if key not in baseline.get("results", {}):
+            continue
+        old = baseline["results"][key]
+        cold = (result["cold_latency_ms"], old.get("cold_latency_ms", {}))
+        checks.append((key + " cold_latency_ms", *cold))
+        checks.append((key + " latency_ms", result["latency_ms"], old["latency_ms"]))
+        checks.append((key + " nodes_settled", result["nodes_settled"], old["nodes_settled"]))
+        checks.append((key + " peak_kb", {"max": result["peak_kb"]}, {"max": old["peak_kb"]}))
+        if result["over_budget"] > old["over_budget"]:
+            regressions.append(
+                "%s over_budget %d -> %d" % (key, old["over_budget"], result["over_budget"])
+            )
+    for name, new, old in checks:
+        for stat, value in new.items():
+            before = old.get(stat)
+            if value is None or not before:
+                continue
+            if name.endswith("_ms") and value - before < NOISE_FLOOR_MS:
+                continue
+            if value > before * (1 + REGRESSION_TOLERANCE):
+                regressions.append("%s %s %.3f -> %.3f" % (name, stat, before, value))
+    return regressions
+
+
+def main() -> None:
+    if len(sys.argv) not in (2, 3):
+        raise Exception("Error: expected a results file and optionally a baseline file")
+
+    results = run_benchmark()
+    with open(sys.argv[1], "w") as file:
+        json.dump(results, file, indent=2)
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
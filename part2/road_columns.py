@@ -0,0 +1,222 @@
+#!/usr/local/bin/python3
+#
+# road_columns.py : Streaming loader for large road-segment and GPS files
+#
+# Usage: ./road_columns.py road-file [gps-file]
+#
+# parse_segments() in route.py builds two Segment objects per line and gives up on
+# the first bad one. This reads the files a chunk of lines at a time straight into
+# typed arrays (one column per field), interns city and highway names to integer
+# ids, and skips malformed rows, counting why each was rejected. Memory grows with
+# the arrays, not with the number of Python objects.
+#
+from array import array
+from math import isfinite, nan
+import sys
+import time
+
+CHUNK_BYTES = 1 << 20
+
+
+class NameTable(object):
+    """Interns strings to dense integer ids"""
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids = dict()
+        self.names = []
+
+    def intern(self, name):
+        index = self.ids.get(name)
+        if index is None:
+            index = len(self.names)
+            self.ids[name] = index
+            self.names.append(name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+
+class RoadColumns(object):
+    """
+    A road network held column by column. Road i runs between cities from_city[i]
+    and to_city[i] (ids into cities), in both directions. After build_adjacency()
+    the roads touching city c are adj_road[adj_start[c]:adj_start[c + 1]], with the
+    city at the other end in adj_city.
+    """
+
+    __slots__ = (
+        "cities",
+        "highways",
+        "from_city",
+        "to_city",
+        "dist",
+        "speed",
+        "highway",
+        "lat",
+        "lon",
+        "adj_start",
+        "adj_road",
+        "adj_city",
+        "rows",
+        "skipped",
+    )
+
+    def __init__(self):
+        self.cities = NameTable()
+        self.highways = NameTable()
+        self.from_city = array("i")
+        self.to_city = array("i")
+        self.dist = array("d")
+        self.speed = array("d")
+        self.highway = array("i")
+        self.lat = array("d")
+        self.lon = array("d")
+        self.adj_start = array("q")
+        self.adj_road = array("i")
+        self.adj_city = array("i")
+        self.rows = 0
+        self.skipped = dict()
+
+    def __len__(self):
+        return len(self.dist)
+
+    def _skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def add_roads(self, lines):
+        """Appends a chunk of road-segments lines, skipping any that don't parse"""
+        intern_city = self.cities.intern
+        intern_highway = self.highways.intern
+        for line in lines:
+            fields = line.split()
+            if len(fields) == 0:
+                continue
+            self.rows += 1
+            if len(fields) != 5:
+                self._skip("wrong number of fields")
+                continue
+            c1, c2, dist, speed, name = fields
+            try:
+                dist = float(dist)
+                speed = float(speed)
+            except ValueError:
+                self._skip("not a number")
+                continue
+            if not isfinite(dist) or dist < 0:
+                self._skip("bad length")
+                continue
+            # mpg in route.py hits zero at 150mph, and time divides by the speed
+            if not 0 < speed < 150:
+                self._skip("bad speed limit")
+                continue
+            self.from_city.append(intern_city(c1))
+            self.to_city.append(intern_city(c2))
+            self.dist.append(dist)
+            self.speed.append(speed)
+            self.highway.append(intern_highway(name))
+
+    def add_gps(self, lines):
+        """
+        Fills in coordinates from a chunk of city-gps lines. Cities that aren't on any
+        road are interned too, so the gps file can be read before or after the roads.
+        """
+        intern_city = self.cities.intern
+        for line in lines:
+            fields = line.split()
+            if len(fields) == 0:
+                continue
+            self.rows += 1
+            if len(fields) != 3:
+                self._skip("wrong number of gps fields")
+                continue
+            try:
+                lat, lon = float(fields[1]), float(fields[2])
+            except ValueError:
+                self._skip("not a number")
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                self._skip("bad coordinates")
+                continue
+            index = intern_city(fields[0])
+            missing = index + 1 - len(self.lat)
+            if missing > 0:
+                self.lat.extend(array("d", [nan]) * missing)
+                self.lon.extend(array("d", [nan]) * missing)
+            self.lat[index] = lat
+            self.lon[index] = lon
+
+    def coords(self, city):
+        """(lat, lon) of a city id, or None if the gps file didn't have it"""
+        if city >= len(self.lat) or self.lat[city] != self.lat[city]:  # NaN
+            return None
+        return self.lat[city], self.lon[city]
+
+    def build_adjacency(self):
+        """Counting-sort the roads by city at either end into flat adjacency arrays"""
+        n = len(self.cities)
+        counts = array("q", bytes(8 * (n + 1)))
+        for c in self.from_city:
+            counts[c + 1] += 1
+        for c in self.to_city:
+            counts[c + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.adj_start = array("q", counts)
+        fill = array("q", counts)
+        self.adj_road = array("i", bytes(4 * counts[n]))
+        self.adj_city = array("i", bytes(4 * counts[n]))
+        for road, (c1, c2) in enumerate(zip(self.from_city, self.to_city)):
+            self.adj_road[fill[c1]] = road
+            self.adj_city[fill[c1]] = c2
+            fill[c1] += 1
+            self.adj_road[fill[c2]] = road
+            self.adj_city[fill[c2]] = c1
+            fill[c2] += 1
+
+
+def _read_chunks(filepath):
+    with open(filepath, "r") as file:
+        while True:
+            lines = file.readlines(CHUNK_BYTES)
+            if len(lines) == 0:
+                return
+            yield lines
+
+
+def load_columns(road_path, gps_path=None):
+    """
+    Streams the road file (and optionally the gps file) into a RoadColumns
+    :return: the RoadColumns with adjacency built
+    """
+    columns = RoadColumns()
+    for lines in _read_chunks(road_path):
+        columns.add_roads(lines)
+    if gps_path is not None:
+        for lines in _read_chunks(gps_path):
+            columns.add_gps(lines)
+    columns.build_adjacency()
+    return columns
+
+
+def main() -> None:
+    if len(sys.argv) not in (2, 3):
+        raise Exception("Error: expected a road file and optionally a gps file")
+
+    tick = time.perf_counter()
+    columns = load_columns(*sys.argv[1:])
+    elapsed = time.perf_counter() - tick
+
+    print("%d roads between %d cities" % (len(columns), len(columns.cities)))
+    for reason, count in sorted(columns.skipped.items()):
+        print("skipped %d rows: %s" % (count, reason))
+    print(
+        "%d rows in %.3fs, %.0f rows/s"
+        % (columns.rows, elapsed, columns.rows / elapsed if elapsed else 0)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 #!/usr/local/bin/python3
 
+from collections import ChainMap, Counter
 from heapq import heappush, heappop
 from math import floor, radians, sin, cos, acos
 import sys
 
+from road_columns import load_columns
+import search_stats  # ../search_stats.py, shared with solve_luddy.py and choose_team.py
+
 CITIES: dict = {}
 DEST_CITY = None
 DEST_COORDS = None
@@ -13,10 +17,25 @@ MAX_DISTANCE = None
 MAX_SPEEDLIMIT = None
 MIN_SPEEDLIMIT = None
 MAX_MPG = 35
+ALTERNATIVES = None
+
+# safety valve for solve(): gives up (returning None) after this many expansions
+NODE_LIMIT = None
+NODES_SETTLED = 0
+
+# bumped by every batch of road updates, so anything cached can tell if it's stale
+GENERATION = 0
+# bumped only by batches that close or reopen roads, which is all components depend on
+CLOSURE_GENERATION = 0
+SPEED_COUNTS = Counter()
+CLOSED_ROADS: dict = {}
+_TREES: dict = {}
+_COMPONENTS = None
+_CONTRACTED = None
 
 
 class Segment(object):
-    __slots__ = ("from_city", "to_city", "dist", "speed", "name", "mpg")
+    __slots__ = ("from_city", "to_city", "dist", "speed", "name", "mpg", "twin")
 
     def __init__(self, from_city, to_city, dist, speed, name):
         self.from_city = from_city
@@ -25,6 +44,7 @@ class Segment(object):
         self.speed = speed
         self.mpg = 400 * (speed / 150) * (1 - (speed / 150)) ** 4
         self.name = name
+        self.twin = None  # the same road travelled the other way
 
     def __repr__(self):
         return f"{self.from_city} {self.to_city} {self.dist} {self.speed} {self.name}"
@@ -108,14 +128,7 @@ class Route(object):
         self.g_cost = self._calc_g_cost()
 
     def _calc_g_cost(self):
-        if HEURISTIC == "segments":
-            return len(self.segments)
-        elif HEURISTIC == "distance":
-            return sum(seg.dist for seg in self.segments)
-        elif HEURISTIC == "time":
-            return sum(seg.dist / seg.speed for seg in self.segments)
-        elif HEURISTIC == "mpg":
-            return sum(seg.dist / seg.mpg for seg in self.segments)  # gallons
+        return sum(segment_cost(seg) for seg in self.segments)
 
     def __repr__(self):
         out = self.segments[0].from_city.name
@@ -125,6 +138,24 @@ class Route(object):
         return out
 
 
+class Shortcut(object):
+    """
+    A chain of segments through pass-through cities, travelled as one edge. The
+    original segments are kept so a route over it unpacks back into them.
+    """
+
+    __slots__ = ("from_city", "to_city", "segments", "cost")
+
+    def __init__(self, segments):
+        self.from_city = segments[0].from_city
+        self.to_city = segments[-1].to_city
+        self.segments = segments
+        self.cost = sum(segment_cost(seg) for seg in segments)
+
+    def __repr__(self):
+        return f"{self.from_city.name} {self.to_city.name} via {len(self.segments)}"
+
+
 class State(object):
     __slots__ = ("city", "route", "cost")
 
@@ -144,20 +175,51 @@ class State(object):
         self.route = None
 
 
+def segment_cost(seg):
+    """cost of travelling a single segment under the current cost function"""
+    if HEURISTIC == "segments":
+        return 1
+    elif HEURISTIC == "distance":
+        return seg.dist
+    elif HEURISTIC == "time":
+        return seg.dist / seg.speed
+    elif HEURISTIC == "mpg":
+        return seg.dist / seg.mpg  # gallons
+
+
 def parse_segments(filepath):
     with open(filepath, "r") as file:
         segments = dict()
         for line in file:
             c1, c2, dist, speed, name = line.split()
-            segments.setdefault(c1, []).append(
-                Segment(c1, c2, float(dist), float(speed), name)
-            )
-            segments.setdefault(c2, []).append(
-                Segment(c2, c1, float(dist), float(speed), name)
-            )
+            there = Segment(c1, c2, float(dist), float(speed), name)
+            back = Segment(c2, c1, float(dist), float(speed), name)
+            there.twin, back.twin = back, there
+            segments.setdefault(c1, []).append(there)
+            segments.setdefault(c2, []).append(back)
         return segments
 
 
+def segments_from_columns(columns):
+    """
+    Same result as parse_segments(), but built from a RoadColumns that the streaming
+    loader has already cleaned of malformed rows
+    """
+    segments = dict()
+    names = columns.cities.names
+    highways = columns.highways.names
+    for c1, c2, dist, speed, name in zip(
+        columns.from_city, columns.to_city, columns.dist, columns.speed, columns.highway
+    ):
+        c1, c2, name = names[c1], names[c2], highways[name]
+        there = Segment(c1, c2, dist, speed, name)
+        back = Segment(c2, c1, dist, speed, name)
+        there.twin, back.twin = back, there
+        segments.setdefault(c1, []).append(there)
+        segments.setdefault(c2, []).append(back)
+    return segments
+
+
 def parse_gps(filepath):
     with open(filepath, "r") as file:
         return {
@@ -170,39 +232,676 @@ def is_goal(state):
     return state.city.name == DEST_CITY
 
 
-def successors(state):
+def successors(state, core):
     return [
-        State(seg.to_city, Route(state.route.segments + [seg]))
-        for seg in state.city.segments
+        State(sc.to_city, Route(state.route.segments + sc.segments))
+        for sc in core[state.city]
     ]
 
 
+def find_components():
+    """
+    Labels every city with the connected component it belongs to, so queries between
+    components can be turned away without searching
+    :return: dict of City -> component number
+    """
+    components = dict()
+    for city in CITIES.values():
+        if city in components:
+            continue
+        label = len(components)
+        components[city] = label
+        stack = [city]
+        while stack:
+            current = stack.pop()
+            for seg in current.segments:
+                if seg.to_city not in components:
+                    components[seg.to_city] = label
+                    stack.append(seg.to_city)
+    return components
+
+
+def components():
+    """
+    find_components() for the roads that are open now. Components only change when a
+    road is closed or reopened, so they're shared by every start, destination and
+    cost function until then.
+    """
+    global _COMPONENTS
+    if _COMPONENTS is None or _COMPONENTS[0] != CLOSURE_GENERATION:
+        _COMPONENTS = (CLOSURE_GENERATION, find_components())
+    return _COMPONENTS[1]
+
+
+def _prune():
+    """
+    Drops cities with a single neighbor, repeatedly, which eats whole dead-end
+    chains
+    :return: (set of pruned cities, dict of City -> neighbors left after pruning,
+             dict of pruned City -> the neighbor it was still attached to, or None)
+    """
+    neighbors = {
+        city: {seg.to_city for seg in city.segments if seg.to_city is not city}
+        for city in CITIES.values()
+    }
+    degree = {city: len(n) for city, n in neighbors.items()}
+    pruned = set()
+    toward = dict()
+    stack = [c for c, d in degree.items() if d <= 1]
+    while stack:
+        city = stack.pop()
+        if city in pruned:
+            continue
+        pruned.add(city)
+        toward[city] = None
+        for neighbor in neighbors[city]:
+            if neighbor not in pruned:
+                toward[city] = neighbor
+                degree[neighbor] -= 1
+                if degree[neighbor] <= 1:
+                    stack.append(neighbor)
+    return pruned, degree, toward
+
+
+def _shortcuts(city, core, pruned, extra=()):
+    """
+    the cheapest chain from city to every core city reachable without stopping in
+    between, treating the cities in extra as core cities that were never pruned
+    """
+    best = dict()
+    for seg in city.segments:
+        if seg.to_city is city or (seg.to_city in pruned and seg.to_city not in extra):
+            continue
+        chain = [seg]
+        current = seg.to_city
+        while current not in core and current not in extra and current is not city:
+            previous = chain[-1].from_city
+            chain.append(
+                min(
+                    (
+                        s
+                        for s in current.segments
+                        if s.to_city is not previous
+                        and s.to_city is not current
+                        and s.to_city not in pruned
+                    ),
+                    key=segment_cost,
+                )
+            )
+            current = chain[-1].to_city
+        if current is city:
+            continue  # ring of pass-through cities back to where we started
+        shortcut = Shortcut(chain)
+        if current not in best or shortcut.cost < best[current].cost:
+            best[current] = shortcut
+    return list(best.values())
+
+
+def _chain_end(start, previous, core, pruned, extra=()):
+    """
+    Walks a chain of pass-through cities away from previous, starting at start
+    :return: the core (or extra) city it ends at, or None for a ring back to start
+    """
+    current = start
+    while current not in core and current not in extra:
+        previous, current = current, next(
+            s.to_city
+            for s in current.segments
+            if s.to_city is not previous
+            and s.to_city is not current
+            and s.to_city not in pruned
+        )
+        if current is start:
+            return None
+    return current
+
+
+def contract():
+    """
+    Prunes dead ends and contracts pass-through chains. Cities with a single
+    neighbor can never be on a route between two other cities, so they're dropped,
+    repeatedly, which eats whole dead-end chains. What's left of the graph is
+    rebuilt around the cities that aren't simple pass-throughs (two neighbors),
+    with each chain between them turned into one Shortcut. Nothing here depends on
+    the start or goal; _keep() puts those back for each query.
+    :return: (dict of City -> list of Shortcut out of it for every remaining city,
+             set of pruned cities, dict of pruned City -> neighbor toward the rest)
+    """
+    pruned, degree, toward = _prune()
+    core = {
+        city: []
+        for city in CITIES.values()
+        if city not in pruned and degree[city] != 2
+    }
+    for city, shortcuts in core.items():
+        shortcuts.extend(_shortcuts(city, core, pruned))
+    return core, pruned, toward
+
+
+def _recontract(core, pruned, changes):
+    """
+    Repairs a contracted graph after roads changed speed but none were closed or
+    reopened. Which cities are pruned or kept only depends on who neighbors whom,
+    so only the chains running over a changed road are contracted again, from the
+    core cities at their ends.
+    :param changes: list of (old Segment, new Segment, old cost) from apply_updates()
+    :return: the repaired core (the original is left untouched)
+    """
+    core = core.copy()
+    ends = set()
+    for old, _, _ in changes:
+        start = old.from_city
+        if old.to_city is start or start in pruned or old.to_city in pruned:
+            continue
+        # every change comes with its twin, so walking one way finds both ends
+        end = _chain_end(start, old.to_city, core, pruned)
+        if end is not None:
+            ends.add(end)
+    for city in ends:
+        core[city] = _shortcuts(city, core, pruned)
+    return core
+
+
+def _keep(core, pruned, toward, cities):
+    """
+    Puts cities that a query starts or ends at back into a contracted graph. A
+    pruned city hangs off the rest by a single path, which comes back with it, and
+    a pass-through city splits its chain in two.
+    :param cities: the cities to keep (start and goal)
+    :return: dict of City -> list of Shortcut for every city whose shortcuts changed
+    """
+    extra = set()
+    for city in cities:
+        while city is not None and city not in extra:
+            extra.add(city)
+            city = toward.get(city)
+    ends = set(extra)
+    for city in extra:
+        if city in core or city in pruned:
+            continue
+        for seg in city.segments:
+            if seg.to_city is city or seg.to_city in pruned:
+                continue
+            end = _chain_end(seg.to_city, city, core, pruned, extra)
+            if end is not None:
+                ends.add(end)
+    return {city: _shortcuts(city, core, pruned, extra) for city in ends}
+
+
+def contracted():
+    """
+    contract() for the current roads and cost function, shared by every start and
+    destination. apply_updates() repairs it when only speeds change, and it is
+    redone once roads are closed or reopened.
+    :return: (core, pruned, toward) as returned by contract()
+    """
+    global _CONTRACTED
+    if _CONTRACTED is None or _CONTRACTED[:2] != (GENERATION, HEURISTIC):
+        _CONTRACTED = (GENERATION, HEURISTIC, *contract())
+    return _CONTRACTED[2:]
+
+
+def preprocess(initial_city):
+    """
+    The contracted graph for a search from initial_city to the destination: the
+    shared contraction with just the start and goal put back in
+    :return: mapping of City -> list of Shortcut out of it
+    """
+    core, pruned, toward = contracted()
+    kept = _keep(core, pruned, toward, (initial_city, CITIES[DEST_CITY]))
+    return ChainMap(kept, core)
+
+
 def solve(initial_city):
+    global NODES_SETTLED
     print("solving")
+    labels = components()
+    if labels[initial_city] != labels[CITIES[DEST_CITY]]:
+        return False
+    core = preprocess(initial_city)
     fringe = []
     heappush(fringe, State(initial_city, Route([])))
+    expanded = 0
+    stats = search_stats.ACTIVE
     while len(fringe) > 0:
         state = heappop(fringe)
+        expanded += 1
+        if NODE_LIMIT and expanded > NODE_LIMIT:
+            NODES_SETTLED += expanded
+            return None
         if is_goal(state):
+            NODES_SETTLED += expanded
             return state.route
-        for succ in successors(state):
+        succs = successors(state, core)
+        for succ in succs:
             heappush(fringe, succ)
+        # routes are never closed, so there are no duplicates or stale entries to count
+        if stats is not None:
+            stats.count(len(fringe), expanded=1, generated=len(succs))
+    NODES_SETTLED += expanded
     return False
 
 
+def reverse_tree(dest_city):
+    """
+    Dijkstra outwards from the destination. Roads are bidirectional with the same
+    cost both ways, so this gives the exact remaining cost from every city to the
+    destination, plus the next segment to take on that cheapest route.
+    :param dest_city: the destination City
+    :return: dict of City -> remaining cost, dict of City -> next Segment
+    """
+    global NODES_SETTLED
+    dist = {dest_city: 0}
+    next_seg = {dest_city: None}
+    settled = set()
+    fringe = [(0, 0, dest_city)]
+    counter = 1
+    stats = search_stats.ACTIVE
+    while len(fringe) > 0:
+        cost, _, city = heappop(fringe)
+        if city in settled:
+            if stats is not None:
+                stats.count(stale=1)
+            continue
+        settled.add(city)
+        duplicates = 0
+        for seg in city.segments:
+            neighbor = seg.to_city
+            new_cost = cost + segment_cost(seg)
+            if neighbor not in dist or new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                next_seg[neighbor] = seg.twin
+                heappush(fringe, (new_cost, counter, neighbor))
+                counter += 1
+            else:
+                duplicates += 1
+        if stats is not None:
+            stats.count(
+                len(fringe),
+                len(settled),
+                expanded=1,
+                generated=len(city.segments),
+                duplicates=duplicates,
+            )
+    NODES_SETTLED += len(settled)
+    return dist, next_seg
+
+
+def cached_reverse_tree(dest_city):
+    """
+    reverse_tree() for the current cost function, kept across queries and repaired
+    in place of a rebuild whenever apply_updates() changes the roads
+    """
+    entry = _TREES.get(dest_city)
+    if entry is None or entry[0] != GENERATION or entry[1] != HEURISTIC:
+        entry = (GENERATION, HEURISTIC, *reverse_tree(dest_city))
+        _TREES[dest_city] = entry
+    return entry[2], entry[3]
+
+
+def _repair_tree(dist, next_seg, changes):
+    """
+    Repairs a reverse tree after some roads changed cost, without rerunning the whole
+    Dijkstra. Cities whose tree route used a road that got dearer (or closed) are cut
+    loose and re-seeded from their neighbors, cheaper roads seed their own endpoints,
+    and improvements are then propagated outwards.
+    :param changes: list of (old Segment, new Segment or None if closed, old cost or
+                    None if the road was closed before)
+    :return: the repaired dist and next_seg dicts (the originals are left untouched)
+    """
+    global NODES_SETTLED
+    dist = dist.copy()
+    next_seg = next_seg.copy()
+    fringe = []
+    counter = 0
+
+    dearer = set()
+    for old, new, old_cost in changes:
+        if next_seg.get(old.from_city) is not old:
+            continue
+        if new is None or segment_cost(new) > old_cost:
+            dearer.add(old.from_city)
+        else:
+            next_seg[old.from_city] = new
+
+    # everything routed over a dearer road has to be worked out again
+    if dearer:
+        children = {}
+        for city, seg in next_seg.items():
+            if seg is not None:
+                children.setdefault(seg.to_city, []).append(city)
+        cut = set()
+        stack = list(dearer)
+        while stack:
+            city = stack.pop()
+            if city in cut:
+                continue
+            cut.add(city)
+            stack.extend(children.get(city, ()))
+        for city in cut:
+            del dist[city]
+            del next_seg[city]
+        for city in cut:
+            for seg in city.segments:
+                if seg.to_city in dist:
+                    cost = dist[seg.to_city] + segment_cost(seg)
+                    if city not in dist or cost < dist[city]:
+                        dist[city] = cost
+                        next_seg[city] = seg
+        for city in cut:
+            if city in dist:
+                heappush(fringe, (dist[city], counter, city))
+                counter += 1
+
+    # roads that got cheaper (or reopened) might now offer a better route
+    for old, new, old_cost in changes:
+        if new is None or (old_cost is not None and segment_cost(new) >= old_cost):
+            continue
+        city = new.from_city
+        if new.to_city in dist:
+            cost = dist[new.to_city] + segment_cost(new)
+            if city not in dist or cost < dist[city]:
+                dist[city] = cost
+                next_seg[city] = new
+                heappush(fringe, (cost, counter, city))
+                counter += 1
+
+    while len(fringe) > 0:
+        cost, _, city = heappop(fringe)
+        if cost != dist.get(city):
+            continue
+        NODES_SETTLED += 1
+        for seg in city.segments:
+            neighbor = seg.to_city
+            new_cost = cost + segment_cost(seg)
+            if neighbor not in dist or new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                next_seg[neighbor] = seg.twin
+                heappush(fringe, (new_cost, counter, neighbor))
+                counter += 1
+    return dist, next_seg
+
+
+def parse_updates(filepath):
+    """
+    Reads road updates, one per line: first city, second city, and either the new
+    speed limit or 'closed'
+    """
+    with open(filepath, "r") as file:
+        return [
+            (c1, c2, None if speed == "closed" else float(speed))
+            for c1, c2, speed in (line.split() for line in file if line.strip())
+        ]
+
+
+def apply_updates(updates):
+    """
+    Applies a batch of road updates to the loaded network without re-parsing anything.
+    Changed roads get new Segment objects and each affected city's segment list is
+    replaced rather than edited, so a query that is already running keeps working on
+    the lists it started with. Speed bounds, heuristics, cached reverse trees and,
+    when no road is closed or reopened, the contracted graph are repaired rather
+    than rebuilt, then GENERATION is bumped, and CLOSURE_GENERATION too if any
+    road was closed or reopened.
+    :param updates: iterable of (city1, city2, speed) applying to every road between
+                    the two cities; a speed of None closes them, and a speed given
+                    for a closed road reopens it
+    :return: the new generation number
+    """
+    global GENERATION, CLOSURE_GENERATION, MAX_SPEEDLIMIT, MIN_SPEEDLIMIT, _CONTRACTED
+
+    # work out everything first so a bad update leaves the network untouched
+    staged = {}
+    for c1, c2, speed in updates:
+        if c1 not in CITIES or c2 not in CITIES:
+            raise Exception(f"Error: unknown city in update {c1} {c2}")
+        roads = [seg for seg in CITIES[c1].segments if seg.to_city.name == c2]
+        roads += CLOSED_ROADS.get((c1, c2), [])
+        if len(roads) == 0:
+            raise Exception(f"Error: no road between {c1} and {c2}")
+        for seg in roads:
+            staged[frozenset((seg, seg.twin))] = (seg, speed)
+
+    changes = []
+    closing = []
+    reopening = []
+    for seg, speed in staged.values():
+        is_closed = seg in CLOSED_ROADS.get((seg.from_city.name, seg.to_city.name), ())
+        if speed is None:
+            if not is_closed:
+                closing.append(seg)
+                for s in (seg, seg.twin):
+                    changes.append((s, None, segment_cost(s)))
+            continue
+        there = Segment(seg.from_city, seg.to_city, seg.dist, speed, seg.name)
+        back = Segment(seg.to_city, seg.from_city, seg.dist, speed, seg.name)
+        there.twin, back.twin = back, there
+        if is_closed:
+            reopening.append(seg)
+            changes.append((seg, there, None))
+            changes.append((seg.twin, back, None))
+        else:
+            changes.append((seg, there, segment_cost(seg)))
+            changes.append((seg.twin, back, segment_cost(seg.twin)))
+
+    # swap in the new segment lists
+    replaced = {old: new for old, new, old_cost in changes if old_cost is not None}
+    added = {}
+    for old, new, old_cost in changes:
+        if old_cost is None:
+            added.setdefault(new.from_city, []).append(new)
+    for city in {old.from_city for old, _, _ in changes}:
+        city.segments = [
+            replaced.get(seg, seg)
+            for seg in city.segments
+            if replaced.get(seg, seg) is not None
+        ] + added.get(city, [])
+    for seg in closing:
+        for s in (seg, seg.twin):
+            CLOSED_ROADS.setdefault((s.from_city.name, s.to_city.name), []).append(s)
+    for seg in reopening:
+        for s in (seg, seg.twin):
+            key = (s.from_city.name, s.to_city.name)
+            CLOSED_ROADS[key].remove(s)
+            if len(CLOSED_ROADS[key]) == 0:
+                del CLOSED_ROADS[key]
+
+    # speed bounds, and the heuristics scaled by them
+    for old, new, old_cost in changes:
+        if old_cost is not None:
+            SPEED_COUNTS[old.speed] -= 1
+            if SPEED_COUNTS[old.speed] == 0:
+                del SPEED_COUNTS[old.speed]
+        if new is not None:
+            SPEED_COUNTS[new.speed] += 1
+    old_max = MAX_SPEEDLIMIT
+    MAX_SPEEDLIMIT = max(SPEED_COUNTS)
+    MIN_SPEEDLIMIT = min(SPEED_COUNTS)
+    if HEURISTIC == "time" and MAX_SPEEDLIMIT != old_max:
+        for city in CITIES.values():
+            city.h_cost *= old_max / MAX_SPEEDLIMIT
+
+    for dest_city, (generation, metric, dist, next_seg) in list(_TREES.items()):
+        if generation != GENERATION or metric != HEURISTIC:
+            del _TREES[dest_city]
+            continue
+        _TREES[dest_city] = (
+            GENERATION + 1,
+            metric,
+            *_repair_tree(dist, next_seg, changes),
+        )
+
+    # components and the shape of the contraction only change with closures
+    if closing or reopening:
+        CLOSURE_GENERATION += 1
+        _CONTRACTED = None
+    elif _CONTRACTED is not None:
+        generation, metric, core, pruned, toward = _CONTRACTED
+        if generation != GENERATION or metric != HEURISTIC:
+            _CONTRACTED = None
+        else:
+            _CONTRACTED = (
+                GENERATION + 1,
+                metric,
+                _recontract(core, pruned, changes),
+                pruned,
+                toward,
+            )
+
+    GENERATION += 1
+    return GENERATION
+
+
+def _spur_search(spur_city, dest_city, tree, banned_cities, banned_segs):
+    """
+    A* from spur_city to dest_city avoiding the banned cities and segments.
+    The reverse tree's remaining costs are a consistent heuristic for the restricted
+    graph, and as soon as a city is popped whose tree route avoids everything banned,
+    that tree route completes an optimal spur and the search stops.
+    :return: list of segments, or None if the destination can't be reached
+    """
+    global NODES_SETTLED
+    dist, next_seg = tree
+    clean = {dest_city: True}
+
+    def is_clean(city):
+        trail = []
+        while city not in clean:
+            seg = next_seg[city]
+            if seg in banned_segs or seg.to_city in banned_cities:
+                clean[city] = False
+                break
+            trail.append(city)
+            city = seg.to_city
+        result = clean[city]
+        for c in trail:
+            clean[c] = result
+        return result
+
+    best_g = {spur_city: 0}
+    parent = {spur_city: None}
+    closed = set()
+    fringe = [(dist[spur_city], 0, spur_city)]
+    counter = 1
+    stats = search_stats.ACTIVE
+    while len(fringe) > 0:
+        _, _, city = heappop(fringe)
+        if city in closed:
+            if stats is not None:
+                stats.count(stale=1)
+            continue
+        closed.add(city)
+        if is_clean(city):
+            NODES_SETTLED += len(closed)
+            tail = []
+            step = city
+            while step is not dest_city:
+                tail.append(next_seg[step])
+                step = next_seg[step].to_city
+            head = []
+            while parent[city] is not None:
+                head.append(parent[city])
+                city = parent[city].from_city
+            return head[::-1] + tail
+        duplicates = 0
+        for seg in city.segments:
+            neighbor = seg.to_city
+            if (
+                seg in banned_segs
+                or neighbor in banned_cities
+                or neighbor in closed
+                or neighbor not in dist
+            ):
+                duplicates += neighbor in closed
+                continue
+            g = best_g[city] + segment_cost(seg)
+            if neighbor not in best_g or g < best_g[neighbor]:
+                best_g[neighbor] = g
+                parent[neighbor] = seg
+                heappush(fringe, (g + dist[neighbor], counter, neighbor))
+                counter += 1
+            else:
+                duplicates += 1
+        if stats is not None:
+            stats.count(
+                len(fringe),
+                len(closed),
+                expanded=1,
+                generated=len(city.segments),
+                duplicates=duplicates,
+            )
+    NODES_SETTLED += len(closed)
+    return None
+
+
+def k_shortest_routes(initial_city, k):
+    """
+    Yen's algorithm for the k cheapest loopless routes under the current cost function.
+    The reverse shortest-path tree is built once and shared by every spur search.
+    :param initial_city: start City
+    :param k: number of routes wanted
+    :return: list of up to k Route objects, cheapest first
+    """
+    dest_city = CITIES[DEST_CITY]
+    labels = components()
+    if labels[initial_city] != labels[dest_city]:
+        return []
+    tree = cached_reverse_tree(dest_city)
+    dist, next_seg = tree
+    if initial_city not in dist:
+        return []
+
+    first = []
+    city = initial_city
+    while city is not dest_city:
+        first.append(next_seg[city])
+        city = next_seg[city].to_city
+    found = [first]
+    seen = {tuple(first)}
+    candidates = []
+    counter = 0
+
+    while len(found) < k:
+        previous = found[-1]
+        for i in range(len(previous)):
+            root = previous[:i]
+            spur_city = previous[i].from_city
+            banned_segs = {
+                path[i] for path in found if len(path) > i and path[:i] == root
+            }
+            banned_cities = {seg.from_city for seg in root}
+            spur = _spur_search(spur_city, dest_city, tree, banned_cities, banned_segs)
+            if spur is None:
+                continue
+            path = root + spur
+            key = tuple(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            heappush(
+                candidates, (sum(segment_cost(seg) for seg in path), counter, path)
+            )
+            counter += 1
+        if len(candidates) == 0:
+            break
+        found.append(heappop(candidates)[2])
+
+    return [Route(path) for path in found]
+
+
 def setup():
     """
     Function to set up start city, destination city, and the heuristic that is to be used
     in this runtime. Followed by destination coordinates, speed limits and the maximum allowed
     distance between segments.
     """
-    global MAX_DISTANCE, MAX_SPEEDLIMIT, MIN_SPEEDLIMIT, START_CITY, DEST_CITY, HEURISTIC
-    global DEST_COORDS, CITIES
+    global ALTERNATIVES
 
-    if len(sys.argv) != 4:
+    if len(sys.argv) not in (4, 5):
         raise (
             Exception(
                 "Error: expected 3 arguments: start city, end city, and cost function"
+                " (optionally followed by the number of alternative routes)"
             )
         )
 
@@ -213,15 +912,40 @@ def setup():
             )
         )
 
-    START_CITY = sys.argv[1]
-    DEST_CITY = sys.argv[2]
-    HEURISTIC = sys.argv[3]
+    ALTERNATIVES = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    load(sys.argv[1], sys.argv[2], sys.argv[3])
 
-    segments = parse_segments("road-segments.txt")
-    gps: dict = parse_gps("city-gps.txt")
+
+def load(start_city, dest_city, heuristic):
+    """
+    Parses the road network and builds the cities for one start, destination and
+    cost function, resetting anything left over from a previous load
+    """
+    global MAX_DISTANCE, MAX_SPEEDLIMIT, MIN_SPEEDLIMIT, START_CITY, DEST_CITY, HEURISTIC
+    global DEST_COORDS, CITIES, GENERATION, CLOSURE_GENERATION, _COMPONENTS, _CONTRACTED
+
+    START_CITY = start_city
+    DEST_CITY = dest_city
+    HEURISTIC = heuristic
+    GENERATION = 0
+    CLOSURE_GENERATION = 0
+    SPEED_COUNTS.clear()
+    CLOSED_ROADS.clear()
+    _TREES.clear()
+    _COMPONENTS = None
+    _CONTRACTED = None
+
+    columns = load_columns("road-segments.txt", "city-gps.txt")
+    segments = segments_from_columns(columns)
+    gps: dict = {
+        name: columns.coords(i)
+        for i, name in enumerate(columns.cities.names)
+        if columns.coords(i) is not None
+    }
     MAX_DISTANCE = max(seg.dist for segs in segments.values() for seg in segs)
     MAX_SPEEDLIMIT = max(seg.speed for segs in segments.values() for seg in segs)
     MIN_SPEEDLIMIT = min(seg.speed for segs in segments.values() for seg in segs)
+    SPEED_COUNTS.update(seg.speed for segs in segments.values() for seg in segs)
 
     DEST_COORDS = gps[DEST_CITY]
 
@@ -257,11 +981,30 @@ def last_line_output(solution):
 
 
 if __name__ == "__main__":
-    setup()
-    result = solve(CITIES[START_CITY])
-    print(result)
-    print("total segments", len(result.segments))
-    print("total distance:", sum(s.dist for s in result.segments))
-    print("total time (hours):", sum(s.dist / s.speed for s in result.segments))
-    print("total gas (gallons):", sum(s.dist / s.mpg for s in result.segments))
-    last_line_output(solution=result)
+    sys.argv = search_stats.parse_flags(sys.argv)
+    with search_stats.phase("parse"):
+        setup()
+    if ALTERNATIVES:
+        with search_stats.phase("search"):
+            routes = k_shortest_routes(CITIES[START_CITY], ALTERNATIVES)
+        with search_stats.phase("output"):
+            for route in routes:
+                last_line_output(solution=route)
+            if len(routes) == 0:
+                print("Inf")
+        sys.exit()
+    with search_stats.phase("setup"):
+        components()
+        contracted()
+    with search_stats.phase("search"):
+        result = solve(CITIES[START_CITY])
+    if not result:
+        print("Inf")
+        sys.exit()
+    with search_stats.phase("output"):
+        print(result)
+        print("total segments", len(result.segments))
+        print("total distance:", sum(s.dist for s in result.segments))
+        print("total time (hours):", sum(s.dist / s.speed for s in result.segments))
+        print("total gas (gallons):", sum(s.dist / s.mpg for s in result.segments))
+        last_line_output(solution=result)
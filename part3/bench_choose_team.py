@@ -0,0 +1,209 @@
+#!/usr/local/bin/python3
+#
+# bench_choose_team.py : Reproducible timing of choose_team.py's solvers
+#
+# Usage: ./bench_choose_team.py results-file [baseline-file]
+#
+# Generates seeded instances of every make_people.py family at each size, runs
+# every solver over each (after the same reductions main() applies), and writes
+# solve time, nodes expanded, peak memory and solution quality as JSON. Quality
+# is the skill found over the best skill any solver found for that instance.
+# Given a baseline from an earlier run, anything that got noticeably worse is
+# flagged.
+#
+from contextlib import redirect_stdout
+from math import floor
+import gc
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+import choose_team
+import make_people
+
+SEED = 2019
+SIZES = (20, 100, 1000, 10000, 100000)
+
+# branch and bound and best-first are stopped after this many nodes and report
+# their incumbent (a node limit rather than a time limit, so the same work is done
+# on any machine). The solvers that can't be stopped only run on pools up to their
+# limit here, and DP only where its table fits under DP_MAX_CELLS.
+NODE_LIMIT = 200000
+SIZE_LIMITS = {"parallel": 50, "multi": 50, "mitm": choose_team.MITM_MAX_PEOPLE}
+
+# time is the best of this many runs, to keep scheduler noise out of it, and the
+# peak memory comes from one more under tracemalloc. Runs slower than
+# REPEAT_MAX seconds are only done once.
+REPEATS = 3
+REPEAT_MAX = 1.0
+
+REGRESSION_TOLERANCE = 0.2
+NOISE_FLOOR_MS = 1.0
+
+
+def runnable(mode: str, people: list) -> bool:
+    """Whether a solver can be expected to finish on a pool"""
+    if len(people) > SIZE_LIMITS.get(mode, len(people)):
+        return False
+    if mode in ("dp", "dp-lean"):
+        scale = choose_team.cost_scale([p.cost for p in people])
+        if choose_team.numpy is None or scale is None:
+            return False
+        capacity = floor(choose_team.BUDGET * scale + 1e-6)
+        return len(people) * (capacity + 1) <= choose_team.DP_MAX_CELLS
+    return True
+
+
+def run_solver(mode: str, people: list, fixed: list) -> dict:
+    """
+    Times one solver on an already reduced pool. Quick runs are repeated for the
+    best time and once more under tracemalloc for the peak memory.
+    """
+    choose_team.STATS.update(nodes=0, time_to_best=0.0, time=0.0, upper_bound=0.0, gap=0.0)
+    with redirect_stdout(io.StringIO()):
+        tick = time.perf_counter()
+        solution = choose_team.SOLVERS[mode](people) if people else ()
+        elapsed = time.perf_counter() - tick
+    nodes = choose_team.STATS["nodes"]
+    gap = choose_team.STATS["gap"]
+    stopped = gap > 0
+
+    peak = None
+    if elapsed <= REPEAT_MAX and people:
+        for _ in range(REPEATS - 1):
+            with redirect_stdout(io.StringIO()):
+                tick = time.perf_counter()
+                choose_team.SOLVERS[mode](people)
+                elapsed = min(elapsed, time.perf_counter() - tick)
+        tracemalloc.start()
+        with redirect_stdout(io.StringIO()):
+            choose_team.SOLVERS[mode](people)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "time_ms": elapsed * 1000,
+        "nodes": nodes,
+        "peak_kb": None if peak is None else peak / 1024,
+        "skill": sum(p.skill for p in fixed) + sum(p.skill for p in solution),
+        "gap": gap,
+        "stopped": stopped,
+    }
+
+
+def run_instance(kind: str, size: int) -> tuple:
+    """
+    Reduces one generated instance and runs every solver that can handle it
+    :return: the reduction's stats, and dict of mode -> run_solver() result
+    """
+    rows = make_people.generate(kind, size, SEED)
+    budget = make_people.budget(rows)
+    reduce_time = None
+    for _ in range(REPEATS):
+        choose_team.BUDGET = budget
+        people = [choose_team.Person(*row) for row in rows]
+        tick = time.perf_counter()
+        people, fixed, choose_team.BUDGET = choose_team.reduce_people(people)
+        reduce_time = min(reduce_time or 1e9, time.perf_counter() - tick)
+    reduced_budget = choose_team.BUDGET
+
+    runs = {}
+    for mode in choose_team.SOLVERS:
+        choose_team.BUDGET = reduced_budget
+        if runnable(mode, people):
+            runs[mode] = run_solver(mode, people, fixed)
+    best = max(run["skill"] for run in runs.values()) if runs else 0.0
+    for run in runs.values():
+        run["quality"] = run["skill"] / best if best else 1.0
+    return {"reduce_ms": reduce_time * 1000, "left": len(people)}, runs
+
+
+def run_benchmark() -> dict:
+    choose_team.NODE_LIMIT = NODE_LIMIT
+    results = {}
+    reductions = {}
+    for kind in make_people.KINDS:
+        for size in SIZES:
+            gc.collect()  # so the last instance's garbage isn't timed with this one
+            reduction, runs = run_instance(kind, size)
+            reductions["%s/%d" % (kind, size)] = reduction
+            for mode in choose_team.SOLVERS:
+                key = "%s/%d/%s" % (kind, size, mode)
+                if mode not in runs:
+                    results[key] = {"skipped": True}
+                    print("%-40s skipped" % key)
+                    continue
+                results[key] = run = runs[mode]
+                print(
+                    "%-40s %10.2f ms %10d nodes   quality %.6f"
+                    % (key, run["time_ms"], run["nodes"], run["quality"])
+                )
+    return {
+        "seed": SEED,
+        "node_limit": NODE_LIMIT,
+        "reductions": reductions,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """
+    Lists every metric that is more than REGRESSION_TOLERANCE worse than the
+    baseline, and every drop in solution quality. Runs stopped by NODE_LIMIT are
+    only compared on quality, as their nodes are just the limit.
+    :return: list of human-readable regression descriptions
+    """
+    regressions = []
+    checks = []
+    for key, result in current["reductions"].items():
+        old = baseline.get("reductions", {}).get(key)
+        if old is not None:
+            checks.append((key, "reduce_ms", result["reduce_ms"], old["reduce_ms"]))
+    for key, result in current["results"].items():
+        old = baseline.get("results", {}).get(key)
+        if old is None or old.get("skipped"):
+            continue
+        if result.get("skipped"):
+            regressions.append("%s no longer runs" % key)
+            continue
+        if result["quality"] < old["quality"] - 1e-9:
+            regressions.append(
+                "%s quality %.6f -> %.6f" % (key, old["quality"], result["quality"])
+            )
+        if result["stopped"] or old["stopped"]:
+            continue
+        for stat in ("time_ms", "nodes", "peak_kb"):
+            checks.append((key, stat, result[stat], old[stat]))
+    for key, stat, value, before in checks:
+        if value is None or not before:
+            continue
+        if stat.endswith("_ms") and value - before < NOISE_FLOOR_MS:
+            continue
+        if value > before * (1 + REGRESSION_TOLERANCE):
+            regressions.append("%s %s %.3f -> %.3f" % (key, stat, before, value))
+    return regressions
+
+
+def main() -> None:
+    if len(sys.argv) not in (2, 3):
+        raise Exception("Error: expected a results file and optionally a baseline file")
+
+    results = run_benchmark()
+    with open(sys.argv[1], "w") as file:
+        json.dump(results, file, indent=2)
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,101 @@
 #
 # Based on skeleton code by D. Crandall, September 2019
 #
+import csv
+import os
 import sys
+import time
+from bisect import bisect_right
+from heapq import heappush, heappop
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from math import floor
+from multiprocessing import Lock, RawArray, RawValue
 from typing import List
 
+import search_stats  # ../search_stats.py, shared with solve_luddy.py and route.py
+
+try:
+    import numpy
+    from people_columns import load_people_columns
+except ImportError:  # only the array solvers and the columnar loader need it
+    numpy = None
+
 BUDGET = None
 
+# the multi solver's other constraints: the most people a team may have, and the
+# most it may have of each role (the optional fourth column of the people file)
+MAX_TEAM = None
+QUOTAS: dict = {}
+LAGRANGE_ROUNDS = 200
+
+# dynamic programming works on integer costs, so costs are scaled by a power of ten
+# with up to this many decimal places. Tables up to DP_FAST_CELLS are always worth
+# it, bigger ones only once there are too many people to trust branch and bound
+# with, and past DP_MAX_CELLS never. Over DP_TABLE_BYTES the memory-lean DP is used.
+DP_MAX_DECIMALS = 4
+DP_FAST_CELLS = 5 * 10 ** 7
+DP_MAX_CELLS = 10 ** 9
+DP_TABLE_BYTES = 1 << 28
+BNB_SMALL_POOL = 30
+
+# meet in the middle is picked for pools of up to MITM_MAX_PEOPLE that DP can't
+# handle quickly. Each half's teams are kept as bits of an int64.
+MITM_MAX_PEOPLE = 50
+MITM_MAX_HALF = 62
+
+# people files of at least COLUMNS_MIN_BYTES are loaded by people_columns.py
+# instead of load_people() when the solver can run on its arrays
+COLUMNS_MIN_BYTES = 1 << 22
+
+# the parallel solver splits the tree breadth first until there are about
+# PARALLEL_SPLIT tasks per worker (or PARALLEL_SPLIT_DEPTH levels, if set). A task
+# that expands PARALLEL_QUOTA nodes without finishing hands its open nodes back to
+# be shared out again. PARALLEL_WORKERS of None means one per CPU.
+PARALLEL_WORKERS = None
+PARALLEL_SPLIT = 8
+PARALLEL_SPLIT_DEPTH = None
+PARALLEL_QUOTA = 20000
+
+# people sorted best skill/cost ratio first, and running totals of their costs and
+# skills in that order (PREFIX_COST[i] is the cost of the first i people)
+PEOPLE: list = []
+PREFIX_COST: list = [0.0]
+PREFIX_SKILL: list = [0.0]
+POSITION: dict = {}
+
+# for solve_multi(): the penalty each of PEOPLE pays for the constraints moved
+# into the objective, running totals of skill less penalty, how many people are
+# worth more than their penalty, and a slot per role with a quota
+PENALTY: list = []
+PREFIX_VALUE: list = [0.0]
+POSITIVE = 0
+ROLE_SLOT: dict = {}
+
+# filled in by the branch and bound solvers: nodes expanded, seconds until the
+# final incumbent was found and until the search finished, and the best skill any
+# team could still have along with how far the incumbent is below it (both only
+# differ from the incumbent when a limit stopped the search)
+STATS = {"nodes": 0, "time_to_best": 0.0, "time": 0.0, "upper_bound": 0.0, "gap": 0.0}
+
+# solve() and solve_best_first() stop after this many seconds or nodes, if set,
+# and return the best team so far. ON_IMPROVE, if set, is called with each new
+# incumbent team as soon as it is found.
+TIME_LIMIT = None
+NODE_LIMIT = None
+ON_IMPROVE = None
+
+# filled in by reduce_people(): how many people it removed or fixed, and why
+REDUCTIONS = {"over_budget": 0, "dominated": 0, "fixed_in": 0, "fixed_out": 0}
+
 
 class Person(object):
-    __slots__ = ("name", "skill", "cost")
+    __slots__ = ("name", "skill", "cost", "role")
 
-    def __init__(self, name, skill, cost):
+    def __init__(self, name, skill, cost, role=None):
         self.name = name
         self.skill = float(skill)
         self.cost = float(cost)
+        self.role = role
 
     def __lt__(self, other):
         return self.skill / self.cost < other.skill / other.cost
@@ -28,13 +110,48 @@ class Person(object):
 
 
 class State(object):
-    __slots__ = ("fixed", "variable", "fixed_skill", "fixed_cost")
+    """
+    PEOPLE[index:] are still undecided. Of PEOPLE[:index], the ones on the team are
+    in chosen, a linked list of (person, rest) pairs that children share with their
+    parent, so branching never copies the team. solve_multi() also keeps count of
+    the team's size and how many of it have each role with a quota (in ROLE_SLOT
+    order).
+    """
+
+    __slots__ = ("index", "fixed_skill", "fixed_cost", "chosen", "size", "roles")
 
-    def __init__(self, fixed, variable):
-        self.fixed = tuple(fixed)
-        self.variable = tuple(variable)
-        self.fixed_skill = sum(p.skill for p in fixed)
-        self.fixed_cost = sum(p.cost for p in fixed)
+    def __init__(self, index, fixed_skill, fixed_cost, chosen, size=0, roles=()):
+        self.index = index
+        self.fixed_skill = fixed_skill
+        self.fixed_cost = fixed_cost
+        self.chosen = chosen
+        self.size = size
+        self.roles = roles
+
+
+def team(state: State) -> tuple:
+    """
+    Unpacks the people chosen in a state, in the order they were considered
+    :param state:
+    :return: tuple of Person
+    """
+    people = []
+    chosen = state.chosen
+    while chosen is not None:
+        person, chosen = chosen
+        people.append(person)
+    return tuple(reversed(people))
+
+
+def file_order(team, position: dict) -> tuple:
+    """
+    Lists a team the way the original solver did, which was the reverse of the
+    order of the people file
+    :param team: iterable of Person
+    :param position: dict of Person -> its line number in the people file
+    :return: tuple of Person
+    """
+    return tuple(sorted(team, key=position.__getitem__, reverse=True))
 
 
 def load_people(filename):
@@ -42,38 +159,80 @@ def load_people(filename):
         return [Person(*line.split()) for line in file]
 
 
+def people_from_columns(columns, indices) -> list:
+    """
+    Person objects for some rows of a people_columns.PeopleColumns
+    :param columns:
+    :param indices: the rows wanted
+    :return: list of Person
+    """
+    indices = numpy.asarray(indices, dtype=numpy.int64)
+    roles = [columns.roles[r] if r >= 0 else None for r in columns.role[indices].tolist()]
+    return [
+        Person(*row)
+        for row in zip(
+            columns.names_of(indices),
+            columns.skill[indices].tolist(),
+            columns.cost[indices].tolist(),
+            roles,
+        )
+    ]
+
+
+def prepare(people: list) -> None:
+    """
+    Sorts the people by skill/cost ratio once and builds the running totals that
+    bound() works from
+    :param people: list of Person
+    """
+    global PEOPLE, PREFIX_COST, PREFIX_SKILL, POSITION
+    PEOPLE = sorted(people, key=lambda p: p.skill / p.cost, reverse=True)
+    POSITION = {person: i for i, person in enumerate(PEOPLE)}
+    PREFIX_COST = [0.0]
+    PREFIX_SKILL = [0.0]
+    for person in PEOPLE:
+        PREFIX_COST.append(PREFIX_COST[-1] + person.cost)
+        PREFIX_SKILL.append(PREFIX_SKILL[-1] + person.skill)
+
+
 def bound(state: State) -> float:
     """
     Returns a skill value that is guaranteed to not be less than that of any
-    combination of people within the budget
+    combination of people within the budget: the greedy fill of the undecided
+    people in ratio order, topped up with a fraction of the first one that doesn't
+    fit. The running totals find that critical person by binary search.
     :param state: state object
     :return:
     """
-    skill = state.fixed_skill
+    start = state.index
     rem_budget = BUDGET - state.fixed_cost
-    for person in sorted(state.variable, reverse=True):
-        if person.cost < rem_budget:
-            skill += person.skill
-            rem_budget -= person.cost
-        else:
-            skill += (rem_budget / person.cost) * person.skill
-            break
+    # the first people after start whose costs add up to no more than rem_budget
+    end = bisect_right(PREFIX_COST, PREFIX_COST[start] + rem_budget, lo=start) - 1
+    skill = state.fixed_skill + PREFIX_SKILL[end] - PREFIX_SKILL[start]
+    if end < len(PEOPLE):
+        rem_budget -= PREFIX_COST[end] - PREFIX_COST[start]
+        skill += (rem_budget / PEOPLE[end].cost) * PEOPLE[end].skill
     return skill
 
 
 def branch(state: State) -> List[State]:
     """
-    Returns up to two states that subdivide the space in two
+    Returns up to two states that subdivide the space in two, by leaving out or
+    taking the next person in ratio order
     :param state:
     :return:
     """
-    people = list(state.variable)
-    if len(people) == 0:
+    if state.index == len(PEOPLE):
         return []
-    person = people.pop()
+    person = PEOPLE[state.index]
     out = []
-    s1 = State(state.fixed, people)
-    s2 = State(state.fixed + (person,), people)
+    s1 = State(state.index + 1, state.fixed_skill, state.fixed_cost, state.chosen)
+    s2 = State(
+        state.index + 1,
+        state.fixed_skill + person.skill,
+        state.fixed_cost + person.cost,
+        (person, state.chosen),
+    )
     if s1.fixed_cost <= BUDGET:
         out.append(s1)
     if s2.fixed_cost <= BUDGET:
@@ -81,51 +240,1169 @@ def branch(state: State) -> List[State]:
     return out
 
 
-def solve(people: list) -> tuple:
+def solve(people: list, incumbent_skill: float = 0.0) -> tuple:
     """
     Start of b&b with popping best fixed skill on each fringe iteration
     :param people:
-    :return:
+    :param incumbent_skill: skill of a team found elsewhere, only better teams
+    are searched for
+    :return: the best team, or () if none has more than incumbent_skill
     """
-    initial_state = State((), people)
+    prepare(people)
+    start = time.perf_counter()
+    STATS.update(nodes=0, time_to_best=0.0)
+    initial_state = State(0, 0.0, 0.0, None)
     fringe = [initial_state]
-    best = initial_state
-    while len(fringe) > 0:
+    best = State(0, incumbent_skill, 0.0, None)
+    stats = search_stats.ACTIVE
+    while len(fringe) > 0 and not limit_reached(start):
         state = fringe.pop()
+        STATS["nodes"] += 1
         if state.fixed_skill > best.fixed_skill:
             best = state
+            improved(start, best)
         succs = branch(state)
+        kept = len(fringe)
         for s in succs:
             if bound(s) > best.fixed_skill:
                 fringe.append(s)
-    return best.fixed
+        if stats is not None:
+            kept = len(fringe) - kept
+            stats.count(
+                len(fringe), expanded=1, generated=len(succs), pruned=len(succs) - kept
+            )
+    upper = max([best.fixed_skill] + [bound(s) for s in fringe])
+    finished(start, best, upper)
+    return team(best)
 
 
-def main() -> None:
+def limit_reached(start: float) -> bool:
+    """Whether the search started at start has used up NODE_LIMIT or TIME_LIMIT"""
+    if NODE_LIMIT is not None and STATS["nodes"] >= NODE_LIMIT:
+        return True
+    return TIME_LIMIT is not None and time.perf_counter() - start >= TIME_LIMIT
+
+
+def improved(start: float, best: State) -> None:
+    STATS["time_to_best"] = time.perf_counter() - start
+    if ON_IMPROVE is not None:
+        ON_IMPROVE(team(best))
+
+
+def finished(start: float, best: State, upper: float) -> None:
+    STATS["time"] = time.perf_counter() - start
+    STATS["upper_bound"] = upper
+    STATS["gap"] = upper - best.fixed_skill
+
+
+def greedy_state() -> State:
+    """
+    Takes everyone who still fits, in ratio order. A decent incumbent to start
+    from, since it's usually close to the bound.
+    :return: a fully decided State
+    """
+    state = State(0, 0.0, 0.0, None)
+    for person in PEOPLE:
+        if state.fixed_cost + person.cost <= BUDGET:
+            state = State(
+                0,
+                state.fixed_skill + person.skill,
+                state.fixed_cost + person.cost,
+                (person, state.chosen),
+            )
+    state.index = len(PEOPLE)
+    return state
+
+
+def dominated(people: list) -> set:
     """
-    The main function to input the budget and solve for it.
+    People some optimal team can do without. Someone is dominated by everyone who
+    costs no more and brings no less skill (ties go to whoever comes first), and
+    swapping a dominated person for one dominating them never makes a team worse.
+    So some optimal team only has a dominated person if it also has all the people
+    dominating them, which is impossible when together they cost more than BUDGET.
+    :param people: list of Person
+    :return: set of Person
+    """
+    order = sorted(people, key=lambda p: (p.cost, -p.skill))
+    ranks = {s: i + 1 for i, s in enumerate(sorted({p.skill for p in people}, reverse=True))}
+    # Fenwick tree over skill rank, best skill first, of the costs of the people so far
+    tree = [0.0] * (len(ranks) + 1)
+    out = set()
+    for person in order:
+        rank = ranks[person.skill]
+        dominating_cost = 0.0
+        i = rank
+        while i > 0:
+            dominating_cost += tree[i]
+            i -= i & -i
+        if person.cost + dominating_cost > BUDGET + 1e-9 * max(1.0, BUDGET):
+            out.add(person)
+        i = rank
+        while i < len(tree):
+            tree[i] += person.cost
+            i += i & -i
+    return out
+
+
+def reduced_cost_fixing(lower: float) -> list:
+    """
+    Reduced cost test against the LP bound over PEOPLE (as left by prepare()).
+    With r the skill/cost ratio of the critical person (the one the bound takes a
+    fraction of), deciding person i against the LP costs the bound
+    |skill - r * cost|, and if that takes it below lower, every team with more
+    skill than lower decides i the LP's way. Some people must fit the budget and
+    some must not.
+    :param lower: skill of a team known to fit
+    :return: per person in PEOPLE, True if they must be taken, False if they must
+    be left out, or None
+    """
+    critical = bisect_right(PREFIX_COST, BUDGET) - 1
+    ratio = PEOPLE[critical].skill / PEOPLE[critical].cost
+    upper = bound(State(0, 0.0, 0.0, None))
+    # a margin for rounding, so nothing is fixed on a difference of a few ulps
+    lower -= 1e-9 * max(1.0, upper)
+    fixed = []
+    for i, person in enumerate(PEOPLE):
+        reduced = person.skill - ratio * person.cost
+        if i < critical and upper - reduced < lower:
+            fixed.append(True)
+        elif i > critical and upper + reduced < lower:
+            fixed.append(False)
+        else:
+            fixed.append(None)
+    return fixed
+
+
+def reduce_people(people: list) -> tuple:
+    """
+    Shrinks the problem before searching it. People over BUDGET and dominated()
+    people are removed, then the rest are fixed by reduced_cost_fixing() against
+    the greedy team. Counts go in REDUCTIONS.
+    :param people: list of Person
+    :return: the people left to decide, the people every optimal team has, and the
+    budget left for the rest
+    """
+    REDUCTIONS.update(over_budget=0, dominated=0, fixed_in=0, fixed_out=0)
+    left = [p for p in people if p.cost <= BUDGET]
+    REDUCTIONS["over_budget"] = len(people) - len(left)
+    out = dominated(left)
+    left = [p for p in left if p not in out]
+    REDUCTIONS["dominated"] = len(out)
+
+    prepare(left)
+    critical = bisect_right(PREFIX_COST, BUDGET) - 1
+    if critical < 0:
+        return list(PEOPLE), [], BUDGET
+    if critical == len(PEOPLE):
+        REDUCTIONS["fixed_in"] = len(PEOPLE)
+        return [], list(PEOPLE), BUDGET - PREFIX_COST[-1]
+    decisions = reduced_cost_fixing(greedy_state().fixed_skill)
+    fixed = [p for p, decision in zip(PEOPLE, decisions) if decision is True]
+    undecided = [p for p, decision in zip(PEOPLE, decisions) if decision is None]
+    REDUCTIONS["fixed_in"] = len(fixed)
+    REDUCTIONS["fixed_out"] = len(decisions) - len(fixed) - len(undecided)
+    return undecided, fixed, BUDGET - sum(p.cost for p in fixed)
+
+
+def solve_best_first(people: list) -> tuple:
+    """
+    Branch and bound that always expands the open node with the highest bound,
+    starting from the greedy team as incumbent. Once the highest bound left is no
+    better than the incumbent, the incumbent is optimal.
+    :param people:
+    :return: tuple of Person
+    """
+    prepare(people)
+    start = time.perf_counter()
+    STATS.update(nodes=0, time_to_best=0.0)
+    best = greedy_state()
+    initial_state = State(0, 0.0, 0.0, None)
+    fringe = [(-bound(initial_state), 0, initial_state)]
+    counter = 1
+    if ON_IMPROVE is not None:
+        ON_IMPROVE(team(best))
+    stats = search_stats.ACTIVE
+    while len(fringe) > 0 and not limit_reached(start):
+        neg_bound, _, state = heappop(fringe)
+        if -neg_bound <= best.fixed_skill:
+            fringe = []
+            break
+        STATS["nodes"] += 1
+        if state.fixed_skill > best.fixed_skill:
+            best = state
+            improved(start, best)
+        succs = branch(state)
+        pruned = 0
+        for s in succs:
+            s_bound = bound(s)
+            if s_bound > best.fixed_skill:
+                heappush(fringe, (-s_bound, counter, s))
+                counter += 1
+            else:
+                pruned += 1
+        if stats is not None:
+            stats.count(len(fringe), expanded=1, generated=len(succs), pruned=pruned)
+    # the heap's top is the highest bound still open
+    upper = max(best.fixed_skill, -fringe[0][0]) if fringe else best.fixed_skill
+    finished(start, best, upper)
+    return team(best)
+
+
+def core_indices(skills, costs) -> list:
+    """
+    Expanding core algorithm for big pools, after Pisinger's minknap. In ratio
+    order an optimal team nearly always takes everyone well before the critical
+    person and nobody well after, so the search starts from that break solution
+    and widens a core of people around the critical one, a step to the right (may
+    add someone) then a step to the left (may drop someone). It keeps every
+    undominated state over the core's choices, and drops states whose bound says
+    they can't beat the best team yet. Once no state is left, or the core covers
+    everyone, the best team is optimal. Usually only a few dozen people either
+    side of the critical one are ever looked at.
+    :param skills: an array of skills
+    :param costs: an array of costs, in the same order
+    :return: the indices of the people on the best team
+    """
+    if numpy is None:
+        raise Exception("Error: the core solver needs numpy")
+    start = time.perf_counter()
+    skills = numpy.asarray(skills, dtype=numpy.float64)
+    costs = numpy.asarray(costs, dtype=numpy.float64)
+    ratios = skills / costs
+    # a stable sort, so ties keep the order prepare() would give them
+    rank = numpy.argsort(-ratios, kind="stable")
+    skills, costs, ratios = skills[rank], costs[rank], ratios[rank]
+    prefix_cost = numpy.concatenate(([0.0], numpy.cumsum(costs)))
+    n = len(costs)
+    critical = int(numpy.searchsorted(prefix_cost, BUDGET, side="right")) - 1
+    if critical < 0:
+        return []
+    if critical == n:
+        return sorted(rank.tolist())
+    # with whole-number skills any team's skill is whole too, so bounds can round down
+    whole = bool(numpy.all(skills == numpy.floor(skills)))
+
+    # the greedy team: everyone who still fits, in ratio order
+    greedy = numpy.zeros(n, dtype=bool)
+    room = BUDGET
+    for i, c in enumerate(costs.tolist()):
+        if c <= room:
+            greedy[i] = True
+            room -= c
+    lower = float(skills[greedy].sum())
+    best_at = None
+    # the states of the break solution with people[s:t + 1] decided differently;
+    # each step keeps, per state, its parent among the last step's states and
+    # whether it changed the step's person
+    cost = numpy.array([prefix_cost[critical]])
+    skill = numpy.array([skills[:critical].sum()])
+    steps = []
+    s, t = critical, critical - 1
+    while len(cost) > 0 and (s > 0 or t < n - 1):
+        if t < n - 1 and (len(steps) % 2 == 0 or s == 0):
+            t += 1
+            person, sign = t, 1.0
+        else:
+            s -= 1
+            person, sign = s, -1.0
+        m = len(cost)
+        cost = numpy.concatenate((cost, cost + sign * costs[person]))
+        skill = numpy.concatenate((skill, skill + sign * skills[person]))
+        parent = numpy.concatenate((numpy.arange(m), numpy.arange(m)))
+        changed = numpy.repeat([False, True], m)
+
+        room = BUDGET - cost
+        fits = room >= 0
+        if fits.any():
+            i = int(numpy.argmax(numpy.where(fits, skill, -numpy.inf)))
+            if skill[i] > lower:
+                lower = skill[i]
+                best_at = (len(steps), person, int(parent[i]), bool(changed[i]))
+
+        # a state under budget can only gain room * (best ratio after t), and one
+        # over budget loses at least its excess * (worst ratio before s)
+        add_ratio = ratios[t + 1] if t + 1 < n else 0.0
+        drop_ratio = ratios[s - 1] if s > 0 else numpy.inf
+        bound = skill + room * numpy.where(fits, add_ratio, drop_ratio)
+        if whole:
+            bound = numpy.floor(bound + 1e-9)
+        keep = bound > lower
+        order = numpy.lexsort((-skill[keep], cost[keep]))
+        cost, skill = cost[keep][order], skill[keep][order]
+        parent, changed = parent[keep][order], changed[keep][order]
+        if len(cost) > 0:
+            undominated = numpy.empty(len(cost), dtype=bool)
+            undominated[0] = True
+            undominated[1:] = skill[1:] > numpy.maximum.accumulate(skill)[:-1]
+            cost, skill = cost[undominated], skill[undominated]
+            parent, changed = parent[undominated], changed[undominated]
+        steps.append((person, parent, changed))
+
+    STATS.update(nodes=sum(len(p) for _, p, _ in steps), time=time.perf_counter() - start)
+    if best_at is None:
+        return sorted(rank[greedy].tolist())
+    on_team = [i < critical for i in range(n)]
+    step, person, at, flipped = best_at
+    while True:
+        if flipped:
+            on_team[person] = not on_team[person]
+        step -= 1
+        if step < 0:
+            break
+        person, parents, changes = steps[step]
+        at, flipped = int(parents[at]), bool(changes[at])
+    return sorted(rank[numpy.array(on_team)].tolist())
+
+
+def solve_core(people: list) -> tuple:
+    """
+    Runs core_indices() on a list of Person
+    :param people:
+    :return: tuple of Person
+    """
+    chosen = core_indices([p.skill for p in people], [p.cost for p in people])
+    return tuple(people[i] for i in chosen)
+
+
+class Incumbent(object):
+    """
+    The best state found so far by any process, in shared memory: its skill, when
+    it was found, and its path (see path()). Readers check the skill without the
+    lock, since workers only need it to prune; the path is only compared on ties.
+    """
+
+    __slots__ = ("skill", "found", "path", "length", "lock")
+
+    def __init__(self, size):
+        self.skill = RawValue("d", 0.0)
+        self.found = RawValue("d", time.time())
+        self.path = RawArray("B", max(size, 1))
+        self.length = RawValue("i", 0)
+        self.lock = Lock()
+
+
+INCUMBENT = None
+
+
+def path(state: State) -> bytes:
+    """
+    The leave/take decisions made for PEOPLE[:index], 0 for take and 1 for leave.
+    solve() takes before it leaves, so of two states the one with the smaller path
+    is the one it expands first.
+    :param state:
+    :return: bytes of length state.index
+    """
+    decisions = bytearray(b"\x01") * state.index
+    chosen = state.chosen
+    while chosen is not None:
+        person, chosen = chosen
+        decisions[POSITION[person]] = 0
+    return bytes(decisions)
+
+
+def offer(state: State) -> None:
+    """
+    Makes state the shared incumbent if it has more skill, or the same skill and
+    solve() would have reached it first, so ties are settled the way it settles them
+    :param state:
+    """
+    if state.fixed_skill < INCUMBENT.skill.value:
+        return
+    key = path(state)
+    with INCUMBENT.lock:
+        skill = INCUMBENT.skill.value
+        if state.fixed_skill > skill or (
+            state.fixed_skill == skill
+            and key < bytes(INCUMBENT.path[: INCUMBENT.length.value])
+        ):
+            INCUMBENT.skill.value = state.fixed_skill
+            INCUMBENT.path[: len(key)] = key
+            INCUMBENT.length.value = len(key)
+            INCUMBENT.found.value = time.time()
+
+
+def promising(state: State) -> bool:
+    """
+    Whether a state can still lead to a better incumbent. A bound equal to the
+    incumbent's skill only counts if the subtree comes before the incumbent in
+    solve()'s order, as it could then hold the team solve() would have returned.
+    :param state:
+    :return:
+    """
+    s_bound = bound(state)
+    skill = INCUMBENT.skill.value
+    if s_bound != skill:
+        return s_bound > skill
+    key = path(state)
+    with INCUMBENT.lock:
+        best = bytes(INCUMBENT.path[: INCUMBENT.length.value])
+    return key <= best[: len(key)]
+
+
+def freeze(state: State) -> tuple:
+    """A state as plain numbers, to send to another process"""
+    return (
+        state.index,
+        state.fixed_skill,
+        state.fixed_cost,
+        tuple(POSITION[person] for person in team(state)),
+    )
+
+
+def thaw(frozen: tuple) -> State:
+    """The State that freeze() was given, with this process's Person objects"""
+    index, fixed_skill, fixed_cost, positions = frozen
+    chosen = None
+    for i in positions:
+        chosen = (PEOPLE[i], chosen)
+    return State(index, fixed_skill, fixed_cost, chosen)
+
+
+def _init_worker(people: list, budget: float, incumbent: Incumbent) -> None:
+    global BUDGET, INCUMBENT
+    BUDGET = budget
+    INCUMBENT = incumbent
+    # already in ratio order, and the sort is stable, so the order is unchanged
+    prepare(people)
+
+
+def _explore(frozen: list) -> tuple:
+    """
+    Depth first search of the subtrees under some states, against the shared
+    incumbent, for at most PARALLEL_QUOTA nodes
+    :param frozen: list of frozen states
+    :return: nodes expanded, and the frozen states still open
+    """
+    fringe = [thaw(f) for f in reversed(frozen)]
+    nodes = 0
+    while len(fringe) > 0 and nodes < PARALLEL_QUOTA:
+        state = fringe.pop()
+        nodes += 1
+        offer(state)
+        for s in branch(state):
+            if promising(s):
+                fringe.append(s)
+    return nodes, [freeze(s) for s in fringe if promising(s)]
+
+
+def solve_parallel(people: list) -> tuple:
+    """
+    Branch and bound across a pool of processes. The top of the tree is expanded
+    here until there are enough subtrees to go round, and each is searched depth
+    first in a worker. Workers prune against one incumbent in shared memory, and a
+    subtree too big for one task is handed back split into several, so a lopsided
+    tree doesn't leave the other workers idle. Returns the same team as solve().
+    :param people:
+    :return: tuple of Person
+    """
+    global INCUMBENT
+    prepare(people)
+    start = time.perf_counter()
+    started = time.time()
+    STATS.update(nodes=0, time_to_best=0.0)
+    INCUMBENT = Incumbent(len(PEOPLE))
+    workers = PARALLEL_WORKERS or os.cpu_count() or 1
+
+    frontier = [State(0, 0.0, 0.0, None)]
+    depth = 0
+    while len(frontier) > 0 and (
+        depth < PARALLEL_SPLIT_DEPTH
+        if PARALLEL_SPLIT_DEPTH is not None
+        else len(frontier) < workers * PARALLEL_SPLIT
+    ):
+        children = []
+        for state in frontier:
+            STATS["nodes"] += 1
+            offer(state)
+            children.extend(s for s in branch(state) if promising(s))
+        frontier = children
+        depth += 1
+
+    if len(frontier) > 0:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(PEOPLE, BUDGET, INCUMBENT)
+        ) as pool:
+            pending = {pool.submit(_explore, [freeze(s)]) for s in frontier}
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nodes, left = future.result()
+                    STATS["nodes"] += nodes
+                    left = [f for f in left if promising(thaw(f))]
+                    # round robin, so the big subtrees near the root get spread out
+                    share = min(len(left), workers * PARALLEL_SPLIT)
+                    for i in range(share):
+                        pending.add(pool.submit(_explore, left[i::share]))
+
+    STATS["time_to_best"] = max(0.0, INCUMBENT.found.value - started)
+    STATS["time"] = time.perf_counter() - start
+    key = bytes(INCUMBENT.path[: INCUMBENT.length.value])
+    return tuple(person for person, decision in zip(PEOPLE, key) if decision == 0)
+
+
+def can_take(state: State, person: Person) -> bool:
+    """Whether person still fits the budget, MAX_TEAM and their role's quota"""
+    if state.fixed_cost + person.cost > BUDGET:
+        return False
+    if MAX_TEAM is not None and state.size >= MAX_TEAM:
+        return False
+    slot = ROLE_SLOT.get(person.role)
+    return slot is None or state.roles[slot] < QUOTAS[person.role]
+
+
+def take(state: State, person: Person, index: int) -> State:
+    """The state after deciding everyone before index, and taking person"""
+    roles = state.roles
+    slot = ROLE_SLOT.get(person.role)
+    if slot is not None:
+        roles = roles[:slot] + (roles[slot] + 1,) + roles[slot + 1 :]
+    return State(
+        index,
+        state.fixed_skill + person.skill,
+        state.fixed_cost + person.cost,
+        (person, state.chosen),
+        state.size + 1,
+        roles,
+    )
+
+
+def prepare_multi(people: list, multipliers: tuple) -> None:
+    """
+    Orders the people for the multi-constraint bound. Moving the headcount and
+    role constraints into the objective charges everyone a penalty: the headcount
+    multiplier plus their role's multiplier. People are sorted by penalised skill
+    per cost, and PREFIX_VALUE holds running totals of penalised skill.
+    :param people:
+    :param multipliers: (headcount multiplier, dict of role -> multiplier)
+    """
+    global PEOPLE, PREFIX_COST, PREFIX_VALUE, PENALTY, POSITIVE
+    per_head, per_role = multipliers
+    penalty = {id(p): per_head + per_role.get(p.role, 0.0) for p in people}
+    PEOPLE = sorted(people, key=lambda p: (p.skill - penalty[id(p)]) / p.cost, reverse=True)
+    PENALTY = [penalty[id(p)] for p in PEOPLE]
+    PREFIX_COST = [0.0]
+    PREFIX_VALUE = [0.0]
+    for person, charge in zip(PEOPLE, PENALTY):
+        PREFIX_COST.append(PREFIX_COST[-1] + person.cost)
+        PREFIX_VALUE.append(PREFIX_VALUE[-1] + person.skill - charge)
+    # everyone from POSITIVE on is worth nothing once penalised
+    POSITIVE = sum(1 for p, charge in zip(PEOPLE, PENALTY) if p.skill > charge)
+
+
+def _penalised_lp(state: State) -> tuple:
+    """
+    The LP over the undecided people with penalised skills, under what is left of
+    the budget
+    :return: its value, the first person it doesn't take whole, and the fraction
+    of them it takes
+    """
+    start = state.index
+    rem_budget = BUDGET - state.fixed_cost
+    end = bisect_right(PREFIX_COST, PREFIX_COST[start] + rem_budget, lo=start) - 1
+    end = max(start, min(end, POSITIVE))
+    value = PREFIX_VALUE[end] - PREFIX_VALUE[start]
+    fraction = 0.0
+    if end < POSITIVE:
+        fraction = (rem_budget - PREFIX_COST[end] + PREFIX_COST[start]) / PEOPLE[end].cost
+        value += fraction * (PEOPLE[end].skill - PENALTY[end])
+    return value, end, fraction
+
+
+def multi_bound(state: State, multipliers: tuple) -> float:
+    """
+    Lagrangian bound: the penalised LP, plus the multipliers times the room left
+    in the headcount and each quota. Any multipliers give an upper bound, and good
+    ones (see lagrange()) bring it close to the LP with every constraint in it.
+    :param state:
+    :param multipliers: the ones prepare_multi() was called with
+    :return:
+    """
+    per_head, per_role = multipliers
+    value = state.fixed_skill + _penalised_lp(state)[0]
+    if MAX_TEAM is not None:
+        value += per_head * (MAX_TEAM - state.size)
+    for role, slot in ROLE_SLOT.items():
+        value += per_role[role] * (QUOTAS[role] - state.roles[slot])
+    return value
+
+
+def greedy_multi_state() -> State:
+    """Everyone who still fits every constraint, in the current PEOPLE order"""
+    state = State(0, 0.0, 0.0, None, 0, (0,) * len(ROLE_SLOT))
+    for person in PEOPLE:
+        if can_take(state, person):
+            state = take(state, person, 0)
+    state.index = len(PEOPLE)
+    return state
+
+
+def lagrange(people: list) -> tuple:
+    """
+    Subgradient descent on the multipliers of the headcount and role constraints,
+    to make the root's multi_bound() as low as it will go. Each round moves every
+    multiplier against how much room the LP leaves in its constraint, by a step
+    sized from the gap to the best team found so far.
+    :param people:
+    :return: the multipliers giving the lowest bound
+    """
+    multipliers = (0.0, {role: 0.0 for role in ROLE_SLOT})
+    root = State(0, 0.0, 0.0, None, 0, (0,) * len(ROLE_SLOT))
+    prepare_multi(people, multipliers)
+    lower = greedy_multi_state().fixed_skill
+    best, best_bound = multipliers, None
+    step_scale, stalled = 2.0, 0
+    for _ in range(LAGRANGE_ROUNDS):
+        prepare_multi(people, multipliers)
+        lower = max(lower, greedy_multi_state().fixed_skill)
+        upper = multi_bound(root, multipliers)
+        _, end, fraction = _penalised_lp(root)
+        size = end + fraction
+        used = {role: 0.0 for role in ROLE_SLOT}
+        for i, person in enumerate(PEOPLE[: end + 1]):
+            if person.role in used:
+                used[person.role] += 1.0 if i < end else fraction
+        if best_bound is None or upper < best_bound:
+            best, best_bound, stalled = multipliers, upper, 0
+        else:
+            stalled += 1
+            if stalled >= 10:
+                step_scale, stalled = step_scale / 2, 0
+        per_head, per_role = multipliers
+        head_room = MAX_TEAM - size if MAX_TEAM is not None else 0.0
+        role_room = {role: QUOTAS[role] - used[role] for role in ROLE_SLOT}
+        norm = head_room ** 2 + sum(r ** 2 for r in role_room.values())
+        if norm == 0 or upper - lower <= 1e-9 * max(1.0, upper):
+            break
+        step = step_scale * (upper - lower) / norm
+        multipliers = (
+            max(0.0, per_head - step * head_room),
+            {role: max(0.0, per_role[role] - step * role_room[role]) for role in ROLE_SLOT},
+        )
+    return best
+
+
+def solve_multi(people: list) -> tuple:
+    """
+    Branch and bound under the budget, MAX_TEAM and QUOTAS at once. The bound is
+    multi_bound() with multipliers from lagrange(), and the search is depth first
+    from the greedy team, branching on people in penalised ratio order.
+    :param people:
+    :return: tuple of Person
+    """
+    global ROLE_SLOT
+    ROLE_SLOT = {role: i for i, role in enumerate(sorted(QUOTAS))}
+    start = time.perf_counter()
+    STATS.update(nodes=0, time_to_best=0.0)
+    multipliers = lagrange(people)
+    prepare_multi(people, multipliers)
+    best = greedy_multi_state()
+    fringe = [State(0, 0.0, 0.0, None, 0, (0,) * len(ROLE_SLOT))]
+    while len(fringe) > 0:
+        state = fringe.pop()
+        STATS["nodes"] += 1
+        if state.fixed_skill > best.fixed_skill:
+            best = state
+            STATS["time_to_best"] = time.perf_counter() - start
+        if state.index == len(PEOPLE):
+            continue
+        person = PEOPLE[state.index]
+        leave = State(
+            state.index + 1,
+            state.fixed_skill,
+            state.fixed_cost,
+            state.chosen,
+            state.size,
+            state.roles,
+        )
+        succs = [leave]
+        if can_take(state, person):
+            succs.append(take(state, person, state.index + 1))
+        for s in succs:
+            if multi_bound(s, multipliers) > best.fixed_skill:
+                fringe.append(s)
+    STATS["time"] = time.perf_counter() - start
+    return team(best)
+
+
+def cost_scale(costs):
+    """
+    Smallest power of ten that turns every cost into a whole number
+    :param costs: a sequence or array of costs
+    :return: the scale, or None if the costs need more than DP_MAX_DECIMALS places
+    """
+    if numpy is not None:
+        costs = numpy.asarray(costs, dtype=numpy.float64)
+    for decimals in range(DP_MAX_DECIMALS + 1):
+        scale = 10 ** decimals
+        if numpy is not None:
+            scaled = costs * scale
+            if bool(numpy.all(numpy.abs(scaled - numpy.round(scaled)) < 1e-6)):
+                return scale
+        elif all(abs(c * scale - round(c * scale)) < 1e-6 for c in costs):
+            return scale
+    return None
+
+
+def _dp_capacity(costs, scale: int) -> tuple:
+    """integer costs and integer budget at the given scale"""
+    weights = numpy.rint(numpy.asarray(costs, dtype=numpy.float64) * scale)
+    return weights.astype(numpy.int64).tolist(), floor(BUDGET * scale + 1e-6)
+
+
+def _dp_row(best, weight: int, skill: float):
+    """
+    Adds one person to a row of best skills by capacity, in place
+    :return: boolean array of the capacities (from weight upwards) that take them
+    """
+    candidate = best[:-weight] + skill
+    take = candidate > best[weight:]
+    best[weight:] = numpy.where(take, candidate, best[weight:])
+    return take
+
+
+def _dp_best(skills: list, weights: list, capacity: int):
+    """best skill for every capacity from 0 to capacity, with one row of memory"""
+    best = numpy.zeros(capacity + 1)
+    for skill, weight in zip(skills, weights):
+        if weight <= capacity:
+            _dp_row(best, weight, skill)
+    return best
+
+
+def _dp_decisions(skills: list, weights: list, capacity: int) -> list:
+    """
+    Classic 0/1 knapsack DP, one vectorised row update per person. Only the
+    take/leave decisions are kept, packed eight to a byte.
+    :return: one packed row per person, None for people who never fit
+    """
+    best = numpy.zeros(capacity + 1)
+    decisions = []
+    for skill, weight in zip(skills, weights):
+        if weight <= capacity:
+            decisions.append(numpy.packbits(_dp_row(best, weight, skill)))
+        else:
+            decisions.append(None)
+    return decisions
+
+
+def _dp_walk(weights: list, decisions: list, capacity: int) -> list:
+    """
+    Recovers the best team for any capacity up to the one the decisions were built
+    for, by walking them back from that capacity
+    :return: the indices of the people on it, in increasing order
+    """
+    chosen = []
+    remaining = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        weight, bits = weights[i], decisions[i]
+        if bits is None or remaining < weight:
+            continue
+        offset = remaining - weight
+        if (bits[offset >> 3] >> (7 - (offset & 7))) & 1:
+            chosen.append(i)
+            remaining -= weight
+    return chosen[::-1]
+
+
+def _dp_lean(skills: list, weights: list, capacity: int, first: int = 0) -> list:
+    """
+    Same answer as the decision table in O(capacity) memory. The people are split in
+    half, a single-row DP over each half gives the best skill for every capacity,
+    and the budget split with the best combined skill decides how much capacity
+    each half gets when it is solved the same way.
+    :param first: the index of skills[0] in the whole pool
+    :return: the indices of the people on the team, in increasing order
+    """
+    if len(skills) == 0 or capacity <= 0:
+        return []
+    if len(skills) == 1:
+        return [first] if weights[0] <= capacity else []
+    middle = len(skills) // 2
+    left = _dp_best(skills[:middle], weights[:middle], capacity)
+    right = _dp_best(skills[middle:], weights[middle:], capacity)
+    split = int(numpy.argmax(left + right[::-1]))
+    return _dp_lean(skills[:middle], weights[:middle], split, first) + _dp_lean(
+        skills[middle:], weights[middle:], capacity - split, first + middle
+    )
+
+
+def dp_indices(skills, costs, lean: bool = False) -> list:
+    """
+    Dynamic programming over the budget, for costs that are whole numbers once
+    scaled by cost_scale()
+    :param skills: a sequence or array of skills
+    :param costs: a sequence or array of costs, in the same order
+    :param lean: keep O(budget) memory instead of a decision table
+    :return: the indices of the people on the best team
+    """
+    if numpy is None:
+        raise Exception("Error: the dp solvers need numpy")
+    scale = cost_scale(costs)
+    if scale is None:
+        raise Exception(
+            "Error: costs have more than %d decimal places" % DP_MAX_DECIMALS
+        )
+    weights, capacity = _dp_capacity(costs, scale)
+    if capacity < 0:
+        return []
+    skills = numpy.asarray(skills, dtype=numpy.float64).tolist()
+    if lean:
+        return _dp_lean(skills, weights, capacity)
+    return _dp_walk(weights, _dp_decisions(skills, weights, capacity), capacity)
+
+
+def solve_dp(people: list, lean: bool = False) -> tuple:
+    """
+    Runs dp_indices() on a list of Person
+    :param people:
+    :param lean: keep O(budget) memory instead of a decision table
+    :return: tuple of Person
+    """
+    chosen = dp_indices([p.skill for p in people], [p.cost for p in people], lean)
+    return tuple(people[i] for i in chosen)
+
+
+def _frontier(people: list) -> tuple:
+    """
+    The teams from people that fit the budget and that no other team beats on
+    both cost and skill, built up one person at a time: each step adds the
+    person to every team so far, then sorts by cost and keeps only the teams with
+    more skill than every cheaper one.
+    :param people: at most 62 people, so members fit in the bits of an int64
+    :return: arrays of cost, skill and member bits, by increasing cost (and so
+    strictly increasing skill)
+    """
+    cost = numpy.zeros(1)
+    skill = numpy.zeros(1)
+    members = numpy.zeros(1, dtype=numpy.int64)
+    for bit, person in enumerate(people):
+        cost = numpy.concatenate((cost, cost + person.cost))
+        skill = numpy.concatenate((skill, skill + person.skill))
+        members = numpy.concatenate((members, members | (1 << bit)))
+        fits = cost <= BUDGET
+        order = numpy.lexsort((-skill[fits], cost[fits]))
+        cost, skill, members = cost[fits][order], skill[fits][order], members[fits][order]
+        if len(cost) == 0:
+            break
+        keep = numpy.empty(len(cost), dtype=bool)
+        keep[0] = True
+        keep[1:] = skill[1:] > numpy.maximum.accumulate(skill)[:-1]
+        cost, skill, members = cost[keep], skill[keep], members[keep]
+    return cost, skill, members
+
+
+def solve_mitm(people: list) -> tuple:
+    """
+    Meet in the middle: the people are split in two, each half's undominated
+    teams are listed by _frontier(), and every team from the first half is paired
+    with the most skilled team from the second that still fits, which is the
+    most expensive one that fits. Costs are added as they are, never scaled, so
+    any float cost works.
+    :param people:
+    :return: tuple of Person
+    """
+    if numpy is None:
+        raise Exception("Error: the mitm solver needs numpy")
+    if len(people) > 2 * MITM_MAX_HALF:
+        raise Exception("Error: the mitm solver takes at most %d people" % (2 * MITM_MAX_HALF))
+    halves = people[: len(people) // 2], people[len(people) // 2 :]
+    left_cost, left_skill, left_members = _frontier(halves[0])
+    right_cost, right_skill, right_members = _frontier(halves[1])
+    if len(left_cost) == 0 or len(right_cost) == 0:
+        return ()
+
+    at = numpy.searchsorted(right_cost, BUDGET - left_cost, side="right") - 1
+    # BUDGET - cost rounds differently from adding the two costs, which is what
+    # the budget is checked against everywhere else, so settle the edge on the sum
+    up = numpy.minimum(at + 1, len(right_cost) - 1)
+    at = numpy.where(left_cost + right_cost[up] <= BUDGET, up, at)
+    over = left_cost + right_cost[numpy.maximum(at, 0)] > BUDGET
+    at = numpy.where(over, at - 1, at)
+    total = numpy.where(at >= 0, left_skill + right_skill[numpy.maximum(at, 0)], -1.0)
+
+    best = int(numpy.argmax(total))
+    if total[best] < 0:
+        return ()
+    bits = (int(left_members[best]), int(right_members[at[best]]))
+    return tuple(
+        person
+        for half, members in zip(halves, bits)
+        for i, person in enumerate(half)
+        if (members >> i) & 1
+    )
+
+
+def parse_budgets(text: str) -> list:
+    """
+    Budgets for a sweep, as a comma separated list whose items are budgets or
+    start:stop:step ranges (stop included)
+    :param text:
+    :return: list of float
+    """
+    budgets = []
+    for item in text.split(","):
+        parts = [float(x) for x in item.split(":")]
+        if len(parts) == 1:
+            budgets.append(parts[0])
+        elif len(parts) == 3 and parts[2] > 0:
+            start, stop, step = parts
+            count = int(floor((stop - start) / step + 1e-9)) + 1
+            budgets.extend(start + i * step for i in range(max(count, 0)))
+        else:
+            raise Exception("Error: budget ranges are written start:stop:step")
+    return budgets
+
+
+def sweep(people: list, budgets: list) -> list:
+    """
+    Best teams for many budgets in one run. With whole-number costs, one DP
+    decision table built for the largest budget answers every smaller one too,
+    walked back from a different capacity. Otherwise the budgets are solved by
+    branch and bound in increasing order, each search only looking for teams
+    better than the last budget's, which still fits.
+    :param people:
+    :param budgets: list of float
+    :return: list of (budget, team) in the order the budgets were given, each team
+             listed as file_order() lists it
     """
     global BUDGET
-    if len(sys.argv) != 3:
-        raise Exception("Error: expected 2 command line arguments")
+    teams = {}
+    position = {p: i for i, p in enumerate(people)}
+    BUDGET = max(budgets)
+    costs = [p.cost for p in people]
+    scale = cost_scale(costs) if numpy is not None and BUDGET >= 0 else None
+    if scale is not None:
+        weights, capacity = _dp_capacity(costs, scale)
+        if len(people) * (capacity + 1) / 8 > DP_TABLE_BYTES:
+            scale = None
+    if scale is not None:
+        decisions = _dp_decisions([p.skill for p in people], weights, capacity)
+        for budget in budgets:
+            at = floor(budget * scale + 1e-6)
+            teams[budget] = (
+                file_order(
+                    (people[i] for i in _dp_walk(weights, decisions, at)), position
+                )
+                if at >= 0
+                else ()
+            )
+        return [(budget, teams[budget]) for budget in budgets]
+
+    previous = ()
+    for budget in sorted(set(budgets)):
+        BUDGET = budget
+        left, fixed, BUDGET = reduce_people(people)
+        skill = sum(p.skill for p in previous)
+        rest = solve(left, skill - sum(p.skill for p in fixed)) if left else ()
+        candidate = fixed + list(rest)
+        if sum(p.skill for p in candidate) > skill:
+            previous = file_order(candidate, position)
+        teams[budget] = previous
+    return [(budget, teams[budget]) for budget in budgets]
+
+
+SOLVERS = {
+    "bnb": solve,
+    "best-first": solve_best_first,
+    "core": solve_core,
+    "parallel": solve_parallel,
+    "dp": solve_dp,
+    "dp-lean": lambda people: solve_dp(people, lean=True),
+    "mitm": solve_mitm,
+    "multi": solve_multi,
+}
+
+# the solvers that also run straight on arrays of skills and costs, returning the
+# indices of the people on the team
+ARRAY_SOLVERS = {
+    "core": core_indices,
+    "dp": dp_indices,
+    "dp-lean": lambda skills, costs: dp_indices(skills, costs, lean=True),
+}
+
+
+def choose_solver(costs) -> str:
+    """
+    Picks dynamic programming, meet in the middle, the core algorithm or branch
+    and bound from the number of people and the size of the DP table the scaled
+    budget would need
+    :param costs: a sequence or array of everyone's costs
+    :return: a key of SOLVERS
+    """
+    if numpy is None or BUDGET < 0:
+        return "bnb"
+    medium = BNB_SMALL_POOL < len(costs) <= MITM_MAX_PEOPLE
+    large = len(costs) > MITM_MAX_PEOPLE
+    scale = cost_scale(costs)
+    if scale is None:
+        return "mitm" if medium else "core" if large else "bnb"
+    cells = len(costs) * (floor(BUDGET * scale + 1e-6) + 1)
+    if cells > DP_FAST_CELLS and medium:
+        return "mitm"
+    if cells > DP_MAX_CELLS:
+        return "core" if large else "bnb"
+    if cells > DP_FAST_CELLS and len(costs) <= BNB_SMALL_POOL:
+        return "bnb"
+    return "dp" if cells / 8 <= DP_TABLE_BYTES else "dp-lean"
+
+
+def main() -> None:
+    """
+    The main function to input the budget and solve for it. A list or range of
+    budgets (see parse_budgets()) is swept instead, printing a CSV line for each.
+    The bnb and best-first solvers can be given a time limit in seconds and a node
+    limit after them ("-" for none), and then report how far from optimal they got.
+    The multi solver takes the most people a team may have ("-" for no limit) and
+    then optionally role quotas, as in "dev:2,qa:1". Big people files go through
+    people_columns.py, and if the solver can run on the arrays no Person is made
+    except for the team.
+    """
+    global BUDGET, TIME_LIMIT, NODE_LIMIT, ON_IMPROVE, MAX_TEAM
+    sys.argv = search_stats.parse_flags(sys.argv)
+    if len(sys.argv) not in (3, 4, 5, 6):
+        raise Exception(
+            "Error: expected 2 command line arguments, optionally followed by a solver"
+            " and its time and node limits"
+        )
+
+    mode = sys.argv[3] if len(sys.argv) >= 4 else "auto"
+    if mode != "auto" and mode not in SOLVERS:
+        raise Exception(
+            "Error: only %s allowed as solver"
+            % ", ".join("'%s'" % m for m in ["auto", *SOLVERS])
+        )
+    if mode == "multi":
+        if len(sys.argv) < 5:
+            raise Exception("Error: the multi solver needs a team size limit")
+        MAX_TEAM = None if sys.argv[4] == "-" else int(sys.argv[4])
+        if len(sys.argv) == 6:
+            for quota in sys.argv[5].split(","):
+                role, limit = quota.split(":")
+                QUOTAS[role] = int(limit)
+    elif len(sys.argv) >= 5:
+        if mode not in ("bnb", "best-first"):
+            raise Exception("Error: only 'bnb' and 'best-first' take limits")
+        TIME_LIMIT = None if sys.argv[4] == "-" else float(sys.argv[4])
+        if len(sys.argv) == 6 and sys.argv[5] != "-":
+            NODE_LIMIT = int(sys.argv[5])
+
+    if "," in sys.argv[2] or ":" in sys.argv[2]:
+        if mode != "auto":
+            raise Exception("Error: a budget sweep picks its own solver")
+        with search_stats.phase("parse"):
+            people = load_people(sys.argv[1])
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["budget", "skill", "cost", "team"])
+        with search_stats.phase("search"):
+            for budget, solution in sweep(people, parse_budgets(sys.argv[2])):
+                writer.writerow(
+                    [
+                        "%g" % budget,
+                        "%f" % sum(p.skill for p in solution),
+                        "%f" % sum(p.cost for p in solution),
+                        " ".join(p.name for p in solution),
+                    ]
+                )
+        return
 
     BUDGET = float(sys.argv[2])
-    people = load_people(sys.argv[1])
-    solution = solve(people)
+    with search_stats.phase("parse"):
+        columns = None
+        if (
+            numpy is not None
+            and mode in ("auto", *ARRAY_SOLVERS)
+            and os.path.getsize(sys.argv[1]) >= COLUMNS_MIN_BYTES
+        ):
+            columns = load_people_columns(sys.argv[1])
+            print(
+                "loaded %d people%s"
+                % (len(columns), " from the cache" if columns.cached else ""),
+                file=sys.stderr,
+            )
+            if mode == "auto":
+                mode = choose_solver(columns.cost)
+            if mode in ARRAY_SOLVERS:
+                people = []
+            else:
+                people = people_from_columns(columns, range(len(columns)))
+                columns = None
+        else:
+            people = load_people(sys.argv[1])
+    with search_stats.phase("setup"):
+        position = {p: i for i, p in enumerate(people)}
+        fixed = []
+        # dominance and reduced costs only account for the budget, and work on
+        # Person
+        if mode != "multi" and columns is None:
+            people, fixed, BUDGET = reduce_people(people)
+            print(
+                "reduced %d people to %d: %d over budget, %d dominated,"
+                " %d fixed in, %d fixed out"
+                % (
+                    len(people) + sum(REDUCTIONS.values()),
+                    len(people),
+                    REDUCTIONS["over_budget"],
+                    REDUCTIONS["dominated"],
+                    REDUCTIONS["fixed_in"],
+                    REDUCTIONS["fixed_out"],
+                ),
+                file=sys.stderr,
+            )
+        if mode == "auto":
+            mode = choose_solver([p.cost for p in people])
+    STATS.update(nodes=0, time_to_best=0.0, time=0.0, upper_bound=0.0, gap=0.0)
+    fixed_skill = sum(p.skill for p in fixed)
+    started = time.perf_counter()
 
-    if len(solution) == 0:
-        print("Inf")
-    else:
+    def report(found):
         print(
-            "Found a group with %d people costing %f with total skill %f"
-            % (
-                len(solution),
-                sum(p.cost for p in solution),
-                sum(p.skill for p in solution),
-            )
+            "incumbent: skill %f after %.4fs"
+            % (fixed_skill + sum(p.skill for p in found), time.perf_counter() - started),
+            file=sys.stderr,
         )
-        for s in solution:
-            print("%s %f" % (s.name, float(1)))
+
+    if TIME_LIMIT is not None or NODE_LIMIT is not None:
+        ON_IMPROVE = report
+    with search_stats.phase("search"):
+        if columns is not None:
+            chosen = []
+            if len(columns):
+                chosen = ARRAY_SOLVERS[mode](columns.skill, columns.cost)
+            # rows are in file order, and the team is listed last row first
+            chosen = numpy.sort(numpy.asarray(chosen, dtype=numpy.int64))[::-1]
+            solution = tuple(people_from_columns(columns, chosen))
+        else:
+            solution = SOLVERS[mode](people) if len(people) > 0 else ()
+            solution = file_order(fixed + list(solution), position)
+    with search_stats.phase("output"):
+        if STATS["nodes"]:
+            print(
+                "%s: %d nodes, best team found after %.4fs of %.4fs"
+                % (mode, STATS["nodes"], STATS["time_to_best"], STATS["time"]),
+                file=sys.stderr,
+            )
+        if ON_IMPROVE is not None:
+            upper = fixed_skill + STATS["upper_bound"]
+            print(
+                "upper bound %f, gap %f (%.4f%%)"
+                % (upper, STATS["gap"], 100 * STATS["gap"] / upper if upper else 0.0),
+                file=sys.stderr,
+            )
+
+        if len(solution) == 0:
+            print("Inf")
+        else:
+            print(
+                "Found a group with %d people costing %f with total skill %f"
+                % (
+                    len(solution),
+                    sum(p.cost for p in solution),
+                    sum(p.skill for p in solution),
+                )
+            )
+            for s in solution:
+                print("%s %f" % (s.name, float(1)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+#!/usr/local/bin/python3
+#
+# make_people.py : Seeded knapsack instances in the people-file format
+#
+# Usage: ./make_people.py kind count seed [people-file]
+#
+# kind is one of uncorrelated, weakly-correlated, strongly-correlated or
+# subset-sum, the usual test families for 0/1 knapsack. Costs are whole numbers
+# from 1 to RANGE. A budget of half the total cost is printed to stderr, since
+# that is where these families are hardest.
+#
+import random
+import sys
+
+RANGE = 1000
+BUDGET_FRACTION = 0.5
+
+
+def uncorrelated(rng):
+    return rng.randint(1, RANGE), rng.randint(1, RANGE)
+
+
+def weakly_correlated(rng):
+    cost = rng.randint(1, RANGE)
+    return max(1, cost + rng.randint(-RANGE // 10, RANGE // 10)), cost
+
+
+def strongly_correlated(rng):
+    cost = rng.randint(1, RANGE)
+    return cost + RANGE // 10, cost
+
+
+def subset_sum(rng):
+    cost = rng.randint(1, RANGE)
+    return cost, cost
+
+
+KINDS = {
+    "uncorrelated": uncorrelated,
+    "weakly-correlated": weakly_correlated,
+    "strongly-correlated": strongly_correlated,
+    "subset-sum": subset_sum,
+}
+
+
+def generate(kind: str, count: int, seed: int) -> list:
+    """
+    :param kind: a key of KINDS
+    :param count: number of people
+    :param seed:
+    :return: list of (name, skill, cost)
+    """
+    rng = random.Random("%s/%d/%d" % (kind, count, seed))
+    people = []
+    for i in range(count):
+        skill, cost = KINDS[kind](rng)
+        people.append(("P%d" % i, skill, cost))
+    return people
+
+
+def budget(people: list) -> float:
+    return float(int(BUDGET_FRACTION * sum(cost for _, _, cost in people)))
+
+
+def main() -> None:
+    if len(sys.argv) not in (4, 5):
+        raise Exception("Error: expected a kind, a count, a seed and optionally a file")
+    kind = sys.argv[1]
+    if kind not in KINDS:
+        raise Exception(
+            "Error: only %s allowed as kind" % ", ".join("'%s'" % k for k in KINDS)
+        )
+
+    people = generate(kind, int(sys.argv[2]), int(sys.argv[3]))
+    out = open(sys.argv[4], "w") if len(sys.argv) == 5 else sys.stdout
+    for name, skill, cost in people:
+        out.write("%s %d %d\n" % (name, skill, cost))
+    if out is not sys.stdout:
+        out.close()
+    print("budget %g" % budget(people), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/local/bin/python3
+#
+# people_columns.py : Columnar loader for large people files
+#
+# Usage: ./people_columns.py people-file
+#
+# load_people() in choose_team.py builds a Person per line, so for millions of
+# candidates the load alone takes longer than the core solver. This reads the file
+# a chunk of lines at a time into NumPy columns: skills and costs as float64,
+# roles as ids into a small table, and names as one UTF-8 buffer with the end of
+# each name, since the solvers never look at a name until the team is printed.
+# The columns are saved as .npy files in a cache directory next to the people
+# file, and later runs memory-map those instead of parsing the text again.
+#
+import os
+import shutil
+import sys
+import time
+
+import numpy
+
+CHUNK_BYTES = 1 << 20
+
+# the cache of people-file lives in people-file + CACHE_SUFFIX, and is rebuilt
+# when the file's size or modification time no longer match the ones it records
+CACHE_SUFFIX = ".columns"
+CACHE_COLUMNS = ("skill", "cost", "role", "name_end", "names")
+
+
+class PeopleColumns(object):
+    """
+    A pool of people held column by column. Person i has skill[i] and cost[i],
+    role roles[role[i]] (or none, if role[i] is -1), and their name is the UTF-8
+    bytes names[name_end[i - 1]:name_end[i]]. Arrays read from the cache are
+    read-only memory maps.
+    """
+
+    __slots__ = ("skill", "cost", "role", "roles", "name_end", "names", "cached")
+
+    def __init__(self, skill, cost, role, roles, name_end, names, cached=False):
+        self.skill = skill
+        self.cost = cost
+        self.role = role
+        self.roles = roles
+        self.name_end = name_end
+        self.names = names
+        self.cached = cached
+
+    def __len__(self):
+        return len(self.skill)
+
+    def name(self, i):
+        start = int(self.name_end[i - 1]) if i > 0 else 0
+        return bytes(self.names[start : int(self.name_end[i])]).decode("utf-8")
+
+    def names_of(self, indices):
+        """the names of the people at indices, decoded in one pass"""
+        indices = numpy.asarray(indices, dtype=numpy.int64)
+        ends = self.name_end[indices].tolist()
+        starts = numpy.where(indices > 0, self.name_end[indices - 1], 0).tolist()
+        buffer = memoryview(self.names)
+        return [str(buffer[s:e], "utf-8") for s, e in zip(starts, ends)]
+
+    def role_name(self, i):
+        """the role of person i, or None if the file didn't give one"""
+        role = int(self.role[i])
+        return self.roles[role] if role >= 0 else None
+
+
+def _read_chunks(filepath):
+    with open(filepath, "r") as file:
+        while True:
+            lines = file.readlines(CHUNK_BYTES)
+            if len(lines) == 0:
+                return
+            yield lines
+
+
+def parse_people(filepath):
+    """
+    Reads a people file ("name skill cost [role]" per line) into columns
+    :return: a PeopleColumns
+    """
+    roles = dict()
+    skills, costs, role_ids, name_lengths, names = [], [], [], [], []
+    row = 0
+    for lines in _read_chunks(filepath):
+        fields = [line.split() for line in lines]
+        fields = [f for f in fields if len(f) > 0]
+        for f in fields:
+            row += 1
+            if len(f) not in (3, 4):
+                raise Exception(
+                    "Error: %s row %d should be name, skill, cost and optionally role"
+                    % (filepath, row)
+                )
+        try:
+            skills.append(numpy.array([f[1] for f in fields], dtype=numpy.float64))
+            costs.append(numpy.array([f[2] for f in fields], dtype=numpy.float64))
+        except ValueError:
+            raise Exception("Error: skills and costs in %s must be numbers" % filepath)
+        role_ids.append(
+            numpy.array(
+                [roles.setdefault(f[3], len(roles)) if len(f) == 4 else -1 for f in fields],
+                dtype=numpy.int32,
+            )
+        )
+        encoded = [f[0].encode("utf-8") for f in fields]
+        name_lengths.append(numpy.fromiter(map(len, encoded), numpy.int64, len(encoded)))
+        names.append(b"".join(encoded))
+
+    def join(parts, dtype):
+        return numpy.concatenate(parts) if parts else numpy.zeros(0, dtype=dtype)
+
+    return PeopleColumns(
+        join(skills, numpy.float64),
+        join(costs, numpy.float64),
+        join(role_ids, numpy.int32),
+        list(roles),
+        numpy.cumsum(join(name_lengths, numpy.int64)),
+        numpy.frombuffer(b"".join(names), dtype=numpy.uint8),
+    )
+
+
+def _source_stamp(filepath):
+    status = os.stat(filepath)
+    return "%d %d" % (status.st_size, status.st_mtime_ns)
+
+
+def save_cache(columns, filepath):
+    """
+    Writes the columns to the cache of filepath. It is built in a temporary
+    directory and renamed into place, so a reader never sees half of one.
+    """
+    cache = filepath + CACHE_SUFFIX
+    building = "%s.%d" % (cache, os.getpid())
+    shutil.rmtree(building, ignore_errors=True)
+    os.mkdir(building)
+    for column in CACHE_COLUMNS:
+        numpy.save(os.path.join(building, column + ".npy"), getattr(columns, column))
+    with open(os.path.join(building, "roles.txt"), "w") as file:
+        file.write("".join(role + "\n" for role in columns.roles))
+    with open(os.path.join(building, "source.txt"), "w") as file:
+        file.write(_source_stamp(filepath))
+    shutil.rmtree(cache, ignore_errors=True)
+    os.rename(building, cache)
+
+
+def open_cache(filepath):
+    """
+    Memory-maps the cached columns of filepath
+    :return: a PeopleColumns, or None if there is no cache or it is stale
+    """
+    cache = filepath + CACHE_SUFFIX
+    try:
+        with open(os.path.join(cache, "source.txt"), "r") as file:
+            if file.read() != _source_stamp(filepath):
+                return None
+        with open(os.path.join(cache, "roles.txt"), "r") as file:
+            roles = file.read().splitlines()
+        arrays = {
+            column: numpy.load(os.path.join(cache, column + ".npy"), mmap_mode="r")
+            for column in CACHE_COLUMNS
+        }
+    except (OSError, ValueError):
+        return None
+    return PeopleColumns(
+        arrays["skill"],
+        arrays["cost"],
+        arrays["role"],
+        roles,
+        arrays["name_end"],
+        arrays["names"],
+        cached=True,
+    )
+
+
+def load_people_columns(filepath, cache=True):
+    """
+    Opens the cached columns of a people file if they are up to date, otherwise
+    parses the file and (if cache is set) saves them for next time. A cache that
+    can't be written, e.g. in a read-only directory, is skipped.
+    :return: a PeopleColumns
+    """
+    if cache:
+        columns = open_cache(filepath)
+        if columns is not None:
+            return columns
+    columns = parse_people(filepath)
+    if cache:
+        try:
+            save_cache(columns, filepath)
+        except OSError:
+            pass
+    return columns
+
+
+def main() -> None:
+    if len(sys.argv) != 2:
+        raise Exception("Error: expected a people file")
+
+    tick = time.perf_counter()
+    columns = load_people_columns(sys.argv[1])
+    elapsed = time.perf_counter() - tick
+
+    print(
+        "%d people with %d roles%s"
+        % (len(columns), len(columns.roles), " (from the cache)" if columns.cached else "")
+    )
+    print(
+        "%d rows in %.3fs, %.0f rows/s"
+        % (len(columns), elapsed, len(columns) / elapsed if elapsed else 0)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#
+# search_stats.py : Counters, phase timers and profiling shared by the three solvers
+#
+# solve_luddy.py, route.py and choose_team.py take the same flags, which
+# parse_flags() strips from the command line before they read their own:
+#
+#   --stats[=file]       write a JSON report to file, or to stderr, at exit
+#   --progress=seconds   print the counters as a JSON line to stderr that often
+#   --profile=cpu,memory capture cProfile and/or tracemalloc for the whole run
+#
+# Any of them turns the report on. With none of them, ACTIVE stays None. The
+# solvers check it once per expansion, so a run without the flags costs nothing
+# more than that check.
+#
+import atexit
+import contextlib
+import json
+import sys
+import time
+
+# what every solver counts; a solver with no closed list leaves peak_closed at 0
+COUNTERS = ("generated", "expanded", "duplicates", "stale", "peak_open", "peak_closed")
+
+# how many functions and allocation sites the profiles keep
+PROFILE_TOP = 20
+
+ACTIVE = None
+
+
+class SearchStats(object):
+    """
+    Counters and phase timers for one run. count() is called by the search once
+    per expansion, and phase() wraps each part of the run. With profile, cProfile
+    and/or tracemalloc run from construction until report().
+    """
+
+    def __init__(self, progress=None, interval: float = 1.0, profile=()):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.phases = dict()
+        self.progress = progress
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_progress = self.started
+        self.profiler = None
+        self.tracing = False
+        if "cpu" in profile:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if "memory" in profile:
+            import tracemalloc
+
+            tracemalloc.start()
+            self.tracing = True
+
+    def count(self, open_size: int = 0, closed_size: int = 0, **increments) -> None:
+        """
+        Adds to the counters, and raises peak_open and peak_closed to the current
+        sizes of the open and closed lists
+        """
+        counters = self.counters
+        for name, value in increments.items():
+            counters[name] = counters.get(name, 0) + value
+        if open_size > counters["peak_open"]:
+            counters["peak_open"] = open_size
+        if closed_size > counters["peak_closed"]:
+            counters["peak_closed"] = closed_size
+        if self.progress is not None:
+            now = time.perf_counter()
+            if now - self.last_progress >= self.interval:
+                self.last_progress = now
+                self.progress(dict(counters, elapsed=now - self.started))
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """times a part of the run, adding to it if it runs more than once"""
+        tick = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - tick
+
+    def report(self) -> dict:
+        """the counters, phase times and any profiles, ready for json.dump()"""
+        report = {
+            "counters": dict(self.counters),
+            "phases": dict(self.phases),
+            "total": time.perf_counter() - self.started,
+        }
+        if self.profiler is not None:
+            import pstats
+
+            self.profiler.disable()
+            table = pstats.Stats(self.profiler).sort_stats("cumulative")
+            report["cpu"] = [
+                {
+                    "function": "%s:%d(%s)" % where,
+                    "calls": calls,
+                    "own_seconds": own,
+                    "cumulative_seconds": cumulative,
+                }
+                for where, (_, calls, own, cumulative, _) in sorted(
+                    table.stats.items(), key=lambda item: -item[1][3]
+                )[:PROFILE_TOP]
+            ]
+            self.profiler = None
+        if self.tracing:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            tracemalloc.stop()
+            report["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [
+                    {
+                        "where": "%s:%d" % (frame.filename, frame.lineno),
+                        "bytes": s.size,
+                        "blocks": s.count,
+                    }
+                    for s, frame in ((s, s.traceback[0]) for s in top)
+                ],
+            }
+            self.tracing = False
+        return report
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """times a part of the run under ACTIVE, or does nothing without --stats"""
+    if ACTIVE is None:
+        yield
+    else:
+        with ACTIVE.phase(name):
+            yield
+
+
+def _print_progress(counters: dict) -> None:
+    print(json.dumps(counters), file=sys.stderr)
+
+
+def parse_flags(argv: list) -> list:
+    """
+    Strips --stats, --progress and --profile from a command line, and if any
+    were given, starts ACTIVE and arranges for the report to be written at exit
+    :return: the rest of the command line, in order
+    """
+    global ACTIVE
+    rest = []
+    output = None
+    progress = None
+    profile = ()
+    wanted = False
+    for arg in argv:
+        name, _, value = arg.partition("=")
+        if name == "--stats":
+            wanted = True
+            output = value or None
+        elif name == "--progress":
+            wanted = True
+            progress = float(value)
+        elif name == "--profile":
+            wanted = True
+            profile = tuple(value.split(","))
+            if not set(profile) <= {"cpu", "memory"}:
+                raise Exception("Error: only 'cpu' and 'memory' can be profiled")
+        else:
+            rest.append(arg)
+    if wanted:
+        ACTIVE = SearchStats(
+            _print_progress if progress is not None else None,
+            progress if progress is not None else 1.0,
+            profile,
+        )
+        atexit.register(_write_report, ACTIVE, output)
+    return rest
+
+
+def _write_report(stats: SearchStats, output) -> None:
+    report = stats.report()
+    if output is None:
+        json.dump(report, sys.stderr, indent=2)
+        print(file=sys.stderr)
+    else:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)